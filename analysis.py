@@ -1,13 +1,248 @@
 # analysis.py
-import matplotlib.pyplot as plt
-from database import get_all_rl_data
-
-def plot_rewards_over_time():
-    rl_data = get_all_rl_data()
-    rewards = [record['reward'] for record in rl_data]
-    timestamps = [record['timestamp'] for record in rl_data]
-    plt.plot(timestamps, rewards)
-    plt.xlabel('Time')
-    plt.ylabel('Reward')
-    plt.title('Rewards Over Time')
-    plt.show()
+"""
+Reward-over-time analytics computed in SQLite and rendered headless.
+
+Aggregates (count, mean, min, max, percentiles) are computed per hour or day
+by SQLite, so only a few rows per bucket reach Python. Raw series are reduced
+to a min/max envelope in SQL and then downsampled with
+Largest-Triangle-Three-Buckets (LTTB). Memory stays flat regardless of the
+number of RLData rows.
+"""
+import math
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import database
+
+# Timestamps are stored as 'YYYY-MM-DD HH:MM:SS', so a prefix is the bucket
+BUCKET_PREFIXES = {
+    'hour': 13,
+    'day': 10,
+}
+DEFAULT_PERCENTILES = (0.1, 0.5, 0.9)
+DEFAULT_RESOLUTION = 0.5
+EPOCH_SECONDS = "(julianday(timestamp) - 2440587.5) * 86400.0"
+
+
+def _connect(database_file=None):
+    path = os.path.abspath(database_file or database.DATABASE_FILE)
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _time_filter(since, until):
+    clauses, params = ['reward IS NOT NULL'], []
+    if since:
+        clauses.append('timestamp >= ?')
+        params.append(since)
+    if until:
+        clauses.append('timestamp < ?')
+        params.append(until)
+    return ' AND '.join(clauses), params
+
+
+def _bins_percentile(bins, total, fraction):
+    # Nearest-rank percentile over (count, min, max) bins sorted by value. Exact when a bin holds a single
+    # distinct reward, otherwise interpolated inside the bin (error below one bin width).
+    rank = max(1, math.ceil(fraction * total))
+    seen = 0
+    for count, low, high in bins:
+        if seen + count >= rank:
+            if count == 1:
+                return low
+            return low + (high - low) * (rank - seen - 1) / (count - 1)
+        seen += count
+    return bins[-1][2]
+
+
+def _summarize_bucket(bucket, length, bins, percentiles):
+    total = sum(count for count, _low, _high, _sum in bins)
+    result = {
+        'bucket': bucket + ('', ':00:00')[length == 13],
+        'count': total,
+        'mean': sum(bin_sum for _count, _low, _high, bin_sum in bins) / total,
+        'min': bins[0][1],
+        'max': bins[-1][2],
+    }
+    ordered = [(count, low, high) for count, low, high, _sum in bins]
+    for p in percentiles:
+        result[f"p{round(p * 100):02d}"] = _bins_percentile(ordered, total, p)
+    return result
+
+
+def reward_buckets(bucket='day', percentiles=DEFAULT_PERCENTILES, resolution=DEFAULT_RESOLUTION, since=None,
+                   until=None, database_file=None):
+    """
+    Aggregates rewards per time bucket in a single pass over the (timestamp, reward) index.
+
+    Args:
+        bucket (str): 'hour' or 'day'.
+        percentiles (tuple): Fractions in [0, 1] (nearest-rank).
+        resolution (float): Reward bin width used for percentiles.
+        since (str, optional): Inclusive lower bound, e.g. '2024-01-01'.
+        until (str, optional): Exclusive upper bound.
+        database_file (str, optional): Defaults to database.DATABASE_FILE.
+
+    Returns:
+        list: One dict per bucket with bucket, count, mean, min, max and p<NN> keys.
+    """
+    if bucket not in BUCKET_PREFIXES:
+        raise ValueError(f"Unknown bucket '{bucket}', expected one of: {', '.join(BUCKET_PREFIXES)}")
+    if any(not 0.0 <= p <= 1.0 for p in percentiles):
+        raise ValueError("Percentiles must be between 0 and 1")
+
+    length = BUCKET_PREFIXES[bucket]
+    where, params = _time_filter(since, until)
+    # SQLite returns one small row per (bucket, reward bin); only one bucket's bins are held at a time
+    query = f'''
+        SELECT substr(timestamp, 1, ?) AS bucket, CAST(reward / ? AS INTEGER) AS bin,
+               COUNT(*), MIN(reward), MAX(reward), SUM(reward)
+        FROM RLData
+        WHERE {where}
+        GROUP BY bucket, bin
+        ORDER BY bucket, bin
+    '''
+    conn = _connect(database_file)
+    results = []
+    try:
+        current, bins = None, []
+        for name, _bin, count, low, high, total in conn.execute(query, [length, resolution] + params):
+            if name != current and bins:
+                results.append(_summarize_bucket(current, length, bins, percentiles))
+                bins = []
+            current = name
+            bins.append((count, low, high, total))
+        if bins:
+            results.append(_summarize_bucket(current, length, bins, percentiles))
+    finally:
+        conn.close()
+    return results
+
+
+def _largest_triangle(anchor, candidates, right):
+    ax, ay = anchor
+    cx, cy = right
+    return max(candidates, key=lambda p: abs((ax - cx) * (p[1] - ay) - (ax - p[0]) * (cy - ay)))
+
+
+def _mean_point(points):
+    return sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+
+
+def lttb(points, count, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling over a stream of (x, y) points.
+
+    Args:
+        points (iterable): (x, y) pairs ordered by x; may be a database cursor.
+        count (int): Number of points the iterable yields.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        list: The selected (x, y) points, including the first and last.
+    """
+    if threshold >= count or threshold < 3:
+        return [tuple(point) for point in points]
+
+    every = (count - 2) / (threshold - 2)
+    # Exclusive end index of each LTTB bucket; the last one ends at the final point
+    boundaries = [int((i + 1) * every) + 1 for i in range(threshold - 3)] + [count - 1]
+    sampled, pending, current = [], None, []
+    bucket = 0
+    point = None
+    for index, point in enumerate(points):
+        point = tuple(point)
+        if index == 0:
+            sampled.append(point)
+            continue
+        if index == boundaries[bucket]:
+            # The bucket before `current` can now be decided using current's average
+            if pending:
+                sampled.append(_largest_triangle(sampled[-1], pending, _mean_point(current)))
+            pending, current = current, []
+            bucket += 1
+        if index == count - 1:
+            sampled.append(_largest_triangle(sampled[-1], pending, point))
+            sampled.append(point)
+            return sampled
+        current.append(point)
+
+    # Fewer rows than announced (e.g. deleted mid-read): keep whatever was decided plus the last point
+    if point is not None and sampled[-1] != point:
+        sampled.append(point)
+    return sampled
+
+
+def raw_reward_series(max_points=1000, since=None, until=None, database_file=None):
+    """
+    Returns up to max_points (epoch seconds, reward) points that preserve the shape of the raw series.
+
+    SQLite first reduces the rows to a min/max envelope over 2 * max_points time slices, then LTTB picks
+    the points to draw from that envelope.
+    """
+    where, params = _time_filter(since, until)
+    conn = _connect(database_file)
+    try:
+        start, end = conn.execute(f'SELECT MIN({EPOCH_SECONDS}), MAX({EPOCH_SECONDS}) FROM RLData WHERE {where}',
+                                  params).fetchone()
+        if start is None:
+            return []
+        width = max((end - start) / (2 * max_points), 1e-6)
+        envelope = []
+        for x, low, high in conn.execute(f'''
+            SELECT AVG({EPOCH_SECONDS}), MIN(reward), MAX(reward)
+            FROM RLData
+            WHERE {where}
+            GROUP BY CAST(({EPOCH_SECONDS} - ?) / ? AS INTEGER)
+            ORDER BY 1
+        ''', params + [start, width]):
+            envelope.append((x, low))
+            if high != low:
+                envelope.append((x, high))
+    finally:
+        conn.close()
+    return lttb(envelope, len(envelope), max_points)
+
+
+def _bucket_datetime(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S' if ' ' in value else '%Y-%m-%d')
+
+
+def render_rewards(output_file='rewards.png', bucket='day', max_points=1000, since=None, until=None,
+                   database_file=None):
+    """
+    Renders rewards over time to a PNG or SVG file (chosen by extension) without a display.
+
+    Returns:
+        list: The bucket aggregates that were plotted.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    buckets = reward_buckets(bucket, since=since, until=until, database_file=database_file)
+    raw = raw_reward_series(max_points, since=since, until=until, database_file=database_file)
+
+    fig, ax = plt.subplots(figsize=(12, 5))
+    if raw:
+        ax.scatter([datetime.fromtimestamp(x, timezone.utc).replace(tzinfo=None) for x, _ in raw],
+                   [y for _, y in raw], s=4, alpha=0.3, color='grey', label=f'Rewards (≤{max_points} points)')
+    if buckets:
+        times = [_bucket_datetime(b['bucket']) for b in buckets]
+        ax.fill_between(times, [b['p10'] for b in buckets], [b['p90'] for b in buckets],
+                        alpha=0.2, label='p10–p90')
+        ax.plot(times, [b['mean'] for b in buckets], marker='o', markersize=3, label=f'Mean per {bucket}')
+        ax.plot(times, [b['p50'] for b in buckets], linestyle='--', label='Median')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Reward')
+    ax.set_title('Rewards Over Time')
+    ax.legend(loc='best')
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(output_file)
+    plt.close(fig)
+    return buckets
+
+
+def plot_rewards_over_time(output_file='rewards.png', bucket='day', max_points=1000):
+    return render_rewards(output_file, bucket=bucket, max_points=max_points)
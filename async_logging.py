@@ -0,0 +1,212 @@
+# async_logging.py
+"""
+Queue-based logging pipeline.
+
+Log records and console output are handed to background writer threads so
+the pipeline never blocks on terminal or file I/O. Records are written as
+JSON lines to a size-rotated log file; message formatting happens on the
+writer thread. Large payloads (e.g. file contents) passed as
+`extra={'payload': ...}` are stored once in a content-addressed side store
+and the log record only carries their hash.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from clients import LazyConsole
+
+LOG_FILE = 'ai_assistant.log'
+PAYLOAD_DIR = 'log_payloads'
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+_listener = None
+_setup_lock = threading.Lock()
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def store_payload(content, payload_dir=PAYLOAD_DIR):
+    """
+    Stores a payload in the content-addressed side store.
+
+    Args:
+        content (str | bytes): The payload to store.
+        payload_dir (str): Root directory of the store.
+
+    Returns:
+        str: The SHA-256 hex digest the payload is stored under.
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    digest = hashlib.sha256(data).hexdigest()
+    path = payload_path(digest, payload_dir)
+    if not os.path.exists(path):
+        import gzip
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def payload_path(digest, payload_dir=PAYLOAD_DIR):
+    return os.path.join(payload_dir, digest[:2], f"{digest}.gz")
+
+
+def load_payload(digest, payload_dir=PAYLOAD_DIR):
+    """Returns the payload stored under a digest, decoded as UTF-8."""
+    import gzip
+
+    with gzip.open(payload_path(digest, payload_dir), 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, offloading payloads to the side store."""
+
+    def __init__(self, payload_dir=PAYLOAD_DIR):
+        super().__init__()
+        self.payload_dir = payload_dir
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key in _STANDARD_RECORD_ATTRS or key.startswith('_'):
+                continue
+            if key == 'payload':
+                entry['payload_sha256'] = store_payload(value, self.payload_dir)
+                entry['payload_size'] = len(value)
+            else:
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(log_file=LOG_FILE, level=logging.INFO, max_bytes=MAX_LOG_BYTES, backup_count=LOG_BACKUP_COUNT,
+                  payload_dir=PAYLOAD_DIR):
+    """
+    Routes the root logger through a queue to a background JSON file writer.
+    Calling it again is a no-op.
+
+    Args:
+        log_file (str): Path of the log file.
+        level (int): Root logger level.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Number of rotated files to keep.
+        payload_dir (str): Directory of the content-addressed payload store.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        # logging.handlers (and the socket module it pulls in) is only needed once logging starts
+        import logging.handlers
+
+        class _DeferredQueueHandler(logging.handlers.QueueHandler):
+            """QueueHandler that leaves formatting to the listener thread."""
+
+            def prepare(self, record):
+                # Render the traceback now, while it is still available on this thread
+                if record.exc_info and not record.exc_text:
+                    record.exc_text = logging.Formatter().formatException(record.exc_info)
+                    record.exc_info = None
+                return record
+
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                            backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter(payload_dir))
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flushes pending records and stops the background writer."""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class AsyncConsole:
+    """
+    Console whose `print` calls are rendered by a background thread, in order.
+    `input` drains pending output first so prompts always appear after it.
+    """
+
+    def __init__(self, **kwargs):
+        self._console = LazyConsole(**kwargs)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name='console-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            args, kwargs = self._queue.get()
+            try:
+                self._console.print(*args, **kwargs)
+            except Exception as e:
+                logging.error("Console output failed: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def print(self, *args, **kwargs):
+        self._ensure_writer()
+        self._queue.put((args, kwargs))
+
+    def set_quiet(self, quiet=True):
+        """Suppresses (or restores) terminal output, e.g. when running as a daemon."""
+        self.flush()
+        self._console.quiet = quiet
+
+    def flush(self):
+        """Blocks until all queued output has been rendered."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def input(self, *args, **kwargs):
+        self.flush()
+        return self._console.input(*args, **kwargs)
+
+    def __getattr__(self, name):
+        self.flush()
+        return getattr(self._console, name)
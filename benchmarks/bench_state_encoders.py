@@ -0,0 +1,195 @@
+# benchmarks/bench_state_encoders.py
+"""
+Compares Q-table size and convergence of the state encoders on replayed experiences.
+
+Experiences come from the RLData table of an assistant database (--database)
+or from a seeded synthetic stream whose best action depends on the state, in
+which case the greedy policy is also scored against that best action. The
+raw-state dict table the agent used before encoders is included for reference.
+
+Usage:
+    python benchmarks/bench_state_encoders.py --synthetic 20000 --output encoders.json
+    python benchmarks/bench_state_encoders.py --database ai_assistant.db
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from reward_calculation import calculate_reward  # noqa: E402
+from rl_agent import RLAgent  # noqa: E402
+from state_encoders import ENCODERS, build_features, normalize_state  # noqa: E402
+
+ACTIONS = ['proceed', 'modify', 'regenerate']
+LINT_RULES = ['no-unused-vars', 'react/prop-types', 'no-undef', 'react-hooks/exhaustive-deps',
+              '@next/next/no-img-element', 'eqeqeq', 'no-console', 'prefer-const']
+WINDOW = 500
+
+
+class RawTableAgent:
+    """The agent's previous behaviour: one dict row per distinct raw state."""
+
+    def __init__(self, actions, keys, alpha=0.1, gamma=0.9):
+        self.q_table = {}
+        self.actions = actions
+        self.keys = keys
+        self.alpha = alpha
+        self.gamma = gamma
+
+    def _row(self, state):
+        state = normalize_state(state)
+        key = tuple(state.get(name) for name in self.keys)
+        return self.q_table.setdefault(key, {a: 0.0 for a in self.actions})
+
+    def q_values(self, state):
+        state = normalize_state(state)
+        row = self.q_table.get(tuple(state.get(name) for name in self.keys), {})
+        return [row.get(a, 0.0) for a in self.actions]
+
+    def learn(self, state, action, reward, next_state):
+        row = self._row(state)
+        target = reward + self.gamma * max(self._row(next_state).values())
+        error = target - row[action]
+        row[action] += self.alpha * error
+        return error
+
+
+def best_action(state):
+    if not state['tests_passed']:
+        return 'regenerate'
+    if state['lint_errors'] > 5:
+        return 'modify'
+    return 'proceed'
+
+
+def synthetic_state(rng):
+    tests_passed = rng.random() < 0.6
+    lint_errors = min(int(rng.paretovariate(1.1)) - 1, 500)
+    rules = {}
+    for _ in range(lint_errors):
+        rule = rng.choice(LINT_RULES)
+        rules[rule] = rules.get(rule, 0) + 1
+    return build_features(tests_passed, lint_errors, True,
+                          file_size=int(rng.lognormvariate(8, 1)),
+                          test_duration=rng.lognormvariate(1.5, 0.8),
+                          lint_rules=rules)
+
+
+def synthetic_experiences(count, seed):
+    """Logged experiences with uniformly random actions; the best action earns a bonus."""
+    rng = random.Random(seed)
+    experiences = []
+    for _ in range(count):
+        state = synthetic_state(rng)
+        action = rng.choice(ACTIONS)
+        reward = calculate_reward(state['tests_passed'], state['lint_errors'], True)
+        reward += (15 if action == best_action(state) else -15) + rng.gauss(0, 5)
+        experiences.append((state, action, reward, state))
+    return experiences
+
+
+def replayed_experiences(database_file):
+    conn = sqlite3.connect(database_file)
+    rows = conn.execute('SELECT state, action, reward, next_state FROM RLData ORDER BY id').fetchall()
+    conn.close()
+    return [(normalize_state(state), action, reward, normalize_state(next_state))
+            for state, action, reward, next_state in rows
+            if action in ACTIONS and reward is not None and state and next_state]
+
+
+def policy_agreement(agent, states):
+    hits = 0
+    for state in states:
+        values = agent.q_values(state)
+        hits += ACTIONS[values.index(max(values))] == best_action(state)
+    return hits / len(states)
+
+
+def run_agent(name, agent, experiences, held_out, eval_every):
+    started = time.perf_counter()
+    errors, curve = [], []
+    converged_at = None
+    for index, (state, action, reward, next_state) in enumerate(experiences, 1):
+        errors.append(abs(agent.learn(state, action, reward, next_state)))
+        if held_out and index % eval_every == 0:
+            agreement = policy_agreement(agent, held_out)
+            curve.append((index, agreement))
+            if converged_at is None and agreement >= 0.9:
+                converged_at = index
+    elapsed = time.perf_counter() - started
+
+    if isinstance(agent.q_table, dict):
+        rows = len(agent.q_table)
+    else:
+        rows = agent.encoder.size
+    result = {
+        'encoder': name,
+        'table_rows': rows,
+        'table_bytes': len(pickle.dumps(agent.q_table)),
+        'updates': len(experiences),
+        'updates_per_s': len(experiences) / elapsed if elapsed else None,
+        'mean_abs_td_error_last_window': statistics.fmean(errors[-WINDOW:]) if errors else None,
+    }
+    if held_out:
+        result['updates_to_90pct_best_action'] = converged_at
+        result['final_best_action_agreement'] = curve[-1][1] if curve else policy_agreement(agent, held_out)
+        result['agreement_curve'] = curve
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Q-table size and convergence per state encoder")
+    parser.add_argument('--database', help="Replay RLData from this database instead of synthetic experiences")
+    parser.add_argument('--synthetic', type=int, default=20000, help="Number of synthetic experiences")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--eval-every', type=int, default=1000, help="Updates between policy evaluations")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.database:
+        experiences, held_out = replayed_experiences(args.database), None
+    else:
+        experiences = synthetic_experiences(args.synthetic, args.seed)
+        rng = random.Random(args.seed + 1)
+        held_out = [synthetic_state(rng) for _ in range(500)]
+
+    agents = {
+        'raw (tests, lint, comparison)': RawTableAgent(ACTIONS, ('tests_passed', 'lint_errors', 'comparison')),
+        'raw + file_size/test_duration': RawTableAgent(
+            ACTIONS, ('tests_passed', 'lint_errors', 'comparison', 'file_size', 'test_duration')),
+    }
+    for encoder_name, encoder_class in ENCODERS.items():
+        agents[encoder_name] = RLAgent(ACTIONS, encoder=encoder_class())
+
+    results = {
+        'source': args.database or f"synthetic ({args.synthetic}, seed {args.seed})",
+        'experiences': len(experiences),
+        'encoders': [run_agent(name, agent, experiences, held_out, args.eval_every)
+                     for name, agent in agents.items()],
+    }
+
+    for result in results['encoders']:
+        line = (f"{result['encoder']:<32} rows {result['table_rows']:>8}  bytes {result['table_bytes']:>9}  "
+                f"|td| {result['mean_abs_td_error_last_window'] or 0:8.2f}  "
+                f"{result['updates_per_s'] or 0:10.0f} updates/s")
+        if held_out:
+            line += (f"  best-action {result['final_best_action_agreement']:.2f}"
+                     f"  90% after {result['updates_to_90pct_best_action'] or '-'}")
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/import_time.py
+"""
+Import-time budget check.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each entry module and fails if its cumulative import time exceeds the budget.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds
+BUDGETS_MS = {
+    'cli': 30,
+    'main': 60,
+    'openai_integration': 40,
+    'evaluate_model': 40,
+    'analysis': 40,
+    'retrain_agent': 40,
+}
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import_time(module):
+    """
+    Measures the cumulative import time of a module in a fresh interpreter.
+
+    Args:
+        module (str): The top-level module to import.
+
+    Returns:
+        tuple: (cumulative milliseconds, list of (module, ms) for the slowest imports)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    total_us = None
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append((name, int(self_us) / 1000))
+        # The entry module is reported at the outermost indentation level
+        if name == module and len(indent) == 1:
+            total_us = int(cumulative_us)
+
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return (total_us or 0) / 1000, entries[:5]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check module import times against their budgets")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per module; the fastest is kept")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module, budget_ms in BUDGETS_MS.items():
+        runs = [measure_import_time(module) for _ in range(args.repeat)]
+        elapsed_ms, slowest = min(runs, key=lambda run: run[0])
+        status = 'ok' if elapsed_ms <= budget_ms else 'OVER BUDGET'
+        print(f"{module:<20} {elapsed_ms:8.1f} ms  (budget {budget_ms} ms)  {status}")
+        if elapsed_ms > budget_ms:
+            failures.append(module)
+            for name, self_ms in slowest:
+                print(f"    {name:<40} {self_ms:8.1f} ms self")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
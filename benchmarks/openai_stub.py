@@ -0,0 +1,173 @@
+# benchmarks/openai_stub.py
+"""
+Local stand-in for the OpenAI chat-completions endpoint.
+
+Point the client at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+Responses are canned (cycled in order) and delayed by a configurable latency.
+
+Usage:
+    python benchmarks/openai_stub.py --port 8089 --latency 0.5 [--responses responses.json]
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = '''"use client";
+
+import { useState } from "react";
+
+export default function LoginPage() {
+  const [password, setPassword] = useState("");
+  const [showPassword, setShowPassword] = useState(false);
+
+  return (
+    <form className="flex flex-col gap-2">
+      <input
+        type={showPassword ? "text" : "password"}
+        value={password}
+        onChange={(e) => setPassword(e.target.value)}
+      />
+      <button type="button" onClick={() => setShowPassword(!showPassword)}>
+        {showPassword ? "Hide" : "Show"} password
+      </button>
+    </form>
+  );
+}'''
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class OpenAIStubServer:
+    """
+    Threaded HTTP server implementing POST /v1/chat/completions.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+        latency (float): Seconds to wait before answering.
+        jitter (float): Extra random latency, uniformly in [0, jitter].
+        responses (list, optional): Canned completion texts, used in turn.
+        seed (int): Seed for the jitter.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, responses=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.request_count = 0
+        self._responses = itertools.cycle(responses or [DEFAULT_RESPONSE])
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_completion(self):
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            return next(self._responses), delay
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send(404, {'error': {'message': f"Unknown endpoint {self.path}"}})
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    self._send(400, {'error': {'message': "Invalid JSON body"}})
+                    return
+
+                content, delay = stub._next_completion()
+                if delay:
+                    time.sleep(delay)
+                prompt_tokens = sum(estimate_tokens(str(m.get('content', ''))) for m in body.get('messages', []))
+                completion_tokens = estimate_tokens(content)
+                self._send(200, {
+                    'id': f"chatcmpl-stub-{stub.request_count}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'gpt-4'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens,
+                    },
+                })
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='openai-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local OpenAI chat-completions stub")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help="Response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random delay in seconds")
+    parser.add_argument('--responses', help="JSON file with a list of canned completion texts")
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    server = OpenAIStubServer(args.host, args.port, args.latency, args.jitter, responses)
+    print(f"OpenAI stub listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end pipeline benchmarks against a synthetic project and a local OpenAI stub.
+
+Each scenario is repeated and reported as JSON (min/median/p95/mean seconds),
+so results can be compared release to release with --baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --files 5000 --output bench_results.json
+    python benchmarks/run_benchmarks.py --baseline previous.json --scenarios discovery,db_inserts
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [ROOT_DIR, BENCH_DIR]
+
+from openai_stub import OpenAIStubServer  # noqa: E402
+from synthetic_project import generate_project  # noqa: E402
+
+SCENARIOS = ['discovery', 'generation', 'validation', 'db_inserts', 'evaluation', 'retraining']
+ACTIONS = ['proceed', 'modify', 'regenerate']
+
+
+@contextlib.contextmanager
+def quiet_console():
+    """Silences the assistant's console output while a scenario runs."""
+    import main
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            yield
+        finally:
+            main.console.flush()
+
+
+def summarize(timings, operations):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    median = statistics.median(ordered)
+    return {
+        'runs': len(ordered),
+        'operations_per_run': operations,
+        'min_s': ordered[0],
+        'median_s': median,
+        'p95_s': p95,
+        'mean_s': statistics.fmean(ordered),
+        'ops_per_s': operations / median if median else None,
+    }
+
+
+def measure(func, repeat, operations=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, operations)
+
+
+def populate_database(rows, seed=0):
+    import database
+    rng = random.Random(seed)
+    conn = database.get_connection()
+    cur = conn.cursor()
+    for i in range(rows):
+        cur.execute('INSERT INTO Requests (human_request, task_description, file_path, original_content) '
+                    'VALUES (?, ?, ?, ?)', (f"task {i}", f"task {i}", f"app/page{i}.js", "x" * 2000))
+        request_id = cur.lastrowid
+        cur.execute('INSERT INTO CodeGenerations (request_id, version, generated_content) VALUES (?, ?, ?)',
+                    (request_id, 1, "y" * 2000))
+        state = [rng.randint(0, 1), rng.randint(0, 20), 1]
+        cur.execute('INSERT INTO RLData (request_id, state, action, reward, next_state) VALUES (?, ?, ?, ?, ?)',
+                    (request_id, json.dumps(state), rng.choice(ACTIONS), rng.uniform(-50, 50), json.dumps(state)))
+    conn.commit()
+    conn.close()
+
+
+def run_scenarios(args, work_dir):
+    import clients
+    import database
+    import evaluate_model
+    import main
+    import tracing
+    from rl_agent import RLAgent
+
+    db_file = os.path.join(work_dir, 'bench.db')
+    database.DATABASE_FILE = db_file
+    evaluate_model.DATABASE_FILE = db_file
+    database.setup_database()
+
+    project = generate_project(os.path.join(work_dir, 'project'), args.files, seed=args.seed)
+    login_content = open(project['login_page'], encoding='utf-8').read()
+    results = {}
+    selected = args.scenarios
+
+    if 'discovery' in selected:
+        def discover():
+            main._decoded_files.clear()
+            main.find_relevant_files(project['root'], "add show/hide password toggle")
+        with quiet_console():
+            results['discovery'] = measure(discover, args.repeat, operations=project['files'])
+
+    generated_code = None
+    if 'generation' in selected or 'validation' in selected:
+        with OpenAIStubServer(latency=args.llm_latency, seed=args.seed) as stub:
+            os.environ['OPENAI_BASE_URL'] = stub.base_url
+            os.environ['OPENAI_API_KEY'] = 'bench'
+            clients.reset_openai_client()
+            with quiet_console():
+                generated_code = main.generate_complete_code("add show/hide password toggle", login_content)
+                if 'generation' in selected:
+                    results['generation'] = measure(
+                        lambda: main.generate_complete_code("add show/hide password toggle", login_content),
+                        args.repeat)
+            results.setdefault('generation', {})['stub_requests'] = stub.request_count
+        clients.reset_openai_client()
+
+    if 'validation' in selected and generated_code:
+        def validate():
+            for _ in range(100):
+                main.validate_nextjs_code(generated_code)
+                main.post_process_nextjs_code(generated_code)
+        results['validation'] = measure(validate, args.repeat, operations=100)
+
+    if 'db_inserts' in selected:
+        def insert():
+            for i in range(args.db_rows // 10 or 1):
+                request_id = database.insert_request("task", "task", "app/login/page.js", login_content)
+                database.insert_code_generation(request_id, 1, login_content)
+                database.insert_rl_data(request_id, (1, 0, 1), 'proceed', 30, (1, 0, 1))
+        results['db_inserts'] = measure(insert, args.repeat, operations=args.db_rows // 10 or 1)
+
+    if 'evaluation' in selected or 'retraining' in selected:
+        populate_database(args.db_rows, seed=args.seed)
+
+    if 'evaluation' in selected:
+        def evaluate():
+            evaluate_model.analyze_performance(evaluate_model.evaluate_ai_performance())
+        results['evaluation'] = measure(evaluate, args.repeat, operations=args.db_rows)
+
+    if 'retraining' in selected:
+        def retrain():
+            agent = RLAgent(ACTIONS)
+            agent.retrain()
+        results['retraining'] = measure(retrain, args.repeat, operations=args.db_rows)
+
+    tracing.discard_spans()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Returns the scenarios whose median got slower than the baseline by more than threshold (a fraction)."""
+    regressions = {}
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous.get('median_s') or 'median_s' not in current:
+            continue
+        change = (current['median_s'] - previous['median_s']) / previous['median_s']
+        current['change_vs_baseline'] = change
+        if change > threshold:
+            regressions[name] = change
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the assistant's pipeline benchmarks")
+    parser.add_argument('--files', type=int, default=1000, help="Synthetic project size (100 to 50000 files)")
+    parser.add_argument('--db-rows', type=int, default=1000, help="Rows used by the DB, evaluation and retraining scenarios")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Stub response latency in seconds")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated subset of: " + ', '.join(SCENARIOS))
+    parser.add_argument('--output', help="Write results JSON to this file")
+    parser.add_argument('--baseline', help="Results JSON of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed median slowdown vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix='ai-assistant-bench-') as work_dir:
+        scenarios = run_scenarios(args, work_dir)
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'files': args.files, 'db_rows': args.db_rows, 'llm_latency': args.llm_latency,
+                   'repeat': args.repeat, 'seed': args.seed},
+        'scenarios': scenarios,
+    }
+
+    regressions = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+        results['regressions'] = regressions
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# benchmarks/synthetic_project.py
+"""
+Generates synthetic Next.js (app router) projects of configurable size for benchmarks.
+
+Usage:
+    python benchmarks/synthetic_project.py OUTPUT_DIR --files 5000 [--seed 0]
+"""
+import argparse
+import json
+import os
+import random
+
+PAGE_TEMPLATE = '''"use client";
+
+import {{ useState }} from "react";
+import Link from "next/link";
+import {component} from "../../../components/{component}";
+
+export default function {name}Page() {{
+  const [count, setCount] = useState({seed});
+  const items = [{items}];
+
+  if (count > {limit}) {{
+    return <p>Limit reached</p>;
+  }}
+
+  return (
+    <main className="p-4">
+      <h1 className="text-xl">{name}</h1>
+      <{component} value={{count}} onChange={{setCount}} />
+      <ul>
+        {{items.map((item) => (
+          <li key={{item}}>{{item % 2 === 0 ? "even" : "odd"}}</li>
+        ))}}
+      </ul>
+      <Link href="/">Home</Link>
+    </main>
+  );
+}}
+'''
+
+COMPONENT_TEMPLATE = '''export default function {name}({{ value, onChange }}) {{
+  const handleClick = () => {{
+    if (value < {limit} && onChange) {{
+      onChange(value + {step});
+    }} else {{
+      onChange(0);
+    }}
+  }};
+
+  return (
+    <button className="rounded px-2" onClick={{handleClick}}>
+      {name}: {{value}}
+    </button>
+  );
+}}
+'''
+
+UTIL_TEMPLATE = '''export function {name}(input) {{
+  let total = 0;
+  for (let i = 0; i < input.length; i++) {{
+    total += input[i] * {factor};
+  }}
+  return total > {limit} ? {limit} : total;
+}}
+'''
+
+LOGIN_PAGE = '''"use client";
+
+import { useState } from "react";
+
+export default function LoginPage() {
+  const [email, setEmail] = useState("");
+  const [password, setPassword] = useState("");
+
+  return (
+    <form className="flex flex-col gap-2">
+      <input type="email" value={email} onChange={(e) => setEmail(e.target.value)} />
+      <input type="password" value={password} onChange={(e) => setPassword(e.target.value)} />
+      <button type="submit">Log in</button>
+    </form>
+  );
+}
+'''
+
+
+def generate_project(root, num_files, seed=0):
+    """
+    Writes a synthetic Next.js project.
+
+    Args:
+        root (str): Output directory (created if missing).
+        num_files (int): Approximate number of JS/JSX files to generate.
+        seed (int): Random seed; the same seed always yields the same project.
+
+    Returns:
+        dict: Summary with the file counts and the path of the login page.
+    """
+    rng = random.Random(seed)
+    num_files = max(num_files, 4)
+    num_components = max(1, num_files // 4)
+    num_utils = max(1, num_files // 4)
+    num_pages = max(1, num_files - num_components - num_utils - 1)
+
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, 'package.json'), 'w') as f:
+        json.dump({
+            'name': 'synthetic-next-app',
+            'private': True,
+            'scripts': {'dev': 'next dev', 'build': 'next build', 'test': 'jest', 'lint': 'next lint'},
+            'dependencies': {'next': '^14.0.0', 'react': '^18.2.0', 'react-dom': '^18.2.0'},
+        }, f, indent=2)
+
+    components = []
+    for i in range(num_components):
+        name = f"Widget{i}"
+        components.append(name)
+        _write(root, os.path.join('components', f"{name}.jsx"),
+               COMPONENT_TEMPLATE.format(name=name, limit=rng.randint(5, 500), step=rng.randint(1, 9)))
+
+    for i in range(num_utils):
+        _write(root, os.path.join('lib', f"group{i // 100}", f"util{i}.js"),
+               UTIL_TEMPLATE.format(name=f"compute{i}", factor=rng.randint(2, 50), limit=rng.randint(100, 10000)))
+
+    for i in range(num_pages):
+        items = ', '.join(str(rng.randint(0, 99)) for _ in range(rng.randint(1, 8)))
+        _write(root, os.path.join('app', f"section{i // 100}", f"page{i}", 'page.js'),
+               PAGE_TEMPLATE.format(name=f"Page{i}", component=rng.choice(components), seed=rng.randint(0, 9),
+                                    limit=rng.randint(10, 99), items=items))
+
+    login_page = _write(root, os.path.join('app', 'login', 'page.js'), LOGIN_PAGE)
+    return {
+        'root': root,
+        'pages': num_pages + 1,
+        'components': num_components,
+        'utils': num_utils,
+        'files': num_pages + num_components + num_utils + 1,
+        'login_page': login_page,
+    }
+
+
+def _write(root, relative_path, content):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Next.js project")
+    parser.add_argument('output_dir')
+    parser.add_argument('--files', type=int, default=1000, help="Number of JS/JSX files (100 to 50000)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(generate_project(args.output_dir, args.files, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# cli.py
+"""
+Command-line entry point for the AI assistant.
+
+Every subcommand imports the module it needs only when it runs, so
+`python cli.py --help` and the lighter subcommands never pay for openai,
+rich or matplotlib.
+"""
+import argparse
+import sys
+
+
+def cmd_run(args):
+    from main import main
+    main()
+
+
+def cmd_evaluate(args):
+    from evaluate_model import run_evaluation
+    run_evaluation()
+
+
+def cmd_retrain(args):
+    from retrain_agent import retrain_agent
+    retrain_agent()
+
+
+def cmd_analyze(args):
+    from analysis import render_rewards
+    buckets = render_rewards(args.output, bucket=args.bucket, max_points=args.points, since=args.since,
+                             until=args.until)
+    print(f"Wrote {args.output} ({len(buckets)} {args.bucket} buckets)")
+
+
+def cmd_trace(args):
+    from tracing import export_chrome_trace
+    count = export_chrome_trace(args.output, request_id=args.request_id)
+    print(f"Wrote {count} trace events to {args.output}")
+
+
+def cmd_daemon(args):
+    from daemon import run_daemon
+    port = None if args.no_http else args.port
+    run_daemon(host=args.host, port=port, socket_path=args.socket, workers=args.workers,
+               retention_interval=args.retention_interval)
+
+
+def cmd_reindex(args):
+    from database import setup_database
+    from similarity_index import rebuild_index
+    setup_database()
+    print(f"Indexed {rebuild_index()} requests")
+
+
+def cmd_export(args):
+    from export_parquet import export_database
+    tables = [table.strip() for table in args.tables.split(",")] if args.tables else None
+    counts = export_database(args.output_dir, tables=tables, chunk_size=args.chunk_size, full=args.full,
+                             include_content=args.include_content)
+    for table, count in counts.items():
+        print(f"{table}: exported {count} rows")
+
+
+def cmd_retention(args):
+    import retention
+    from database import setup_database
+    setup_database()
+    if args.enable_incremental_vacuum:
+        retention.enable_incremental_vacuum()
+        print("Database switched to incremental auto-vacuum")
+    policy = retention.load_policy(args.policy)
+    stats = retention.apply_retention(policy, archive_dir=args.archive_dir, batch_size=args.batch_size,
+                                      dry_run=args.dry_run)
+    verb = "would process" if args.dry_run else "processed"
+    for table, count in stats.items():
+        if table != 'vacuumed_pages':
+            print(f"{table}: {verb} {count} rows")
+    if stats.get('vacuumed_pages') is not None:
+        print(f"Released {stats['vacuumed_pages']} free pages")
+    elif not args.dry_run:
+        print("Incremental auto-vacuum is off; run with --enable-incremental-vacuum once to shrink the file")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ai-assistant", description="AI Software Engineering Assistant")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    run_parser = subparsers.add_parser("run", help="Implement a feature in a project interactively")
+    run_parser.set_defaults(func=cmd_run)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="Evaluate the agent's past performance")
+    evaluate_parser.set_defaults(func=cmd_evaluate)
+
+    retrain_parser = subparsers.add_parser("retrain", help="Retrain the RL agent from stored experiences")
+    retrain_parser.set_defaults(func=cmd_retrain)
+
+    analyze_parser = subparsers.add_parser("analyze", help="Plot rewards over time")
+    analyze_parser.add_argument("--output", default="rewards.png", help="PNG or SVG file (default: rewards.png)")
+    analyze_parser.add_argument("--bucket", choices=["hour", "day"], default="day", help="Aggregation bucket")
+    analyze_parser.add_argument("--points", type=int, default=1000, help="Raw points kept after downsampling")
+    analyze_parser.add_argument("--since", default=None, help="Only rewards at or after this time (YYYY-MM-DD)")
+    analyze_parser.add_argument("--until", default=None, help="Only rewards before this time (YYYY-MM-DD)")
+    analyze_parser.set_defaults(func=cmd_analyze)
+
+    trace_parser = subparsers.add_parser("trace", help="Export recorded timings as Chrome trace JSON")
+    trace_parser.add_argument("--request-id", type=int, default=None, help="Only export spans of this request")
+    trace_parser.add_argument("--output", default="trace.json", help="Output file (default: trace.json)")
+    trace_parser.set_defaults(func=cmd_trace)
+
+    reindex_parser = subparsers.add_parser("reindex", help="Rebuild the near-duplicate task index from stored requests")
+    reindex_parser.set_defaults(func=cmd_reindex)
+
+    export_parser = subparsers.add_parser("export", help="Export the database to date-partitioned Parquet files")
+    export_parser.add_argument("--output-dir", default="exports", help="Export root (default: exports)")
+    export_parser.add_argument("--tables", default=None, help="Comma-separated tables (default: all)")
+    export_parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per chunk (default: 10000)")
+    export_parser.add_argument("--full", action="store_true", help="Replace the selected tables' exports with everything")
+    export_parser.add_argument("--include-content", action="store_true", help="Include full file contents")
+    export_parser.set_defaults(func=cmd_export)
+
+    retention_parser = subparsers.add_parser("retention", help="Archive and prune old data, then compact the database")
+    retention_parser.add_argument("--policy", default=None, help="Retention policy JSON (default: retention.json)")
+    retention_parser.add_argument("--archive-dir", default="archive", help="Archive directory (default: archive)")
+    retention_parser.add_argument("--batch-size", type=int, default=500, help="Rows per transaction (default: 500)")
+    retention_parser.add_argument("--dry-run", action="store_true", help="Only report what would be processed")
+    retention_parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                                  help="Switch an existing database to incremental auto-vacuum (runs VACUUM once)")
+    retention_parser.set_defaults(func=cmd_retention)
+
+    daemon_parser = subparsers.add_parser("daemon", help="Serve tasks from a long-running process with warm state")
+    daemon_parser.add_argument("--host", default="127.0.0.1", help="HTTP interface (default: 127.0.0.1)")
+    daemon_parser.add_argument("--port", type=int, default=8765, help="HTTP port (default: 8765)")
+    daemon_parser.add_argument("--socket", default=None, help="Also listen on this Unix socket path")
+    daemon_parser.add_argument("--no-http", action="store_true", help="Only listen on the Unix socket")
+    daemon_parser.add_argument("--workers", type=int, default=4, help="Tasks processed concurrently")
+    daemon_parser.add_argument("--retention-interval", type=float, default=None,
+                               help="Apply the retention policy every N seconds in the background")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
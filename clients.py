@@ -0,0 +1,60 @@
+import os
+
+_openai_client = None
+
+
+class LazyConsole:
+    """
+    Stand-in for a rich Console that only imports rich and builds the real
+    console the first time it is used, keeping module import cheap.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._console = None
+
+    def _get(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(**self._kwargs)
+        return self._console
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            super().__setattr__(name, value)
+        else:
+            setattr(self._get(), name, value)
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, constructing it on first use.
+
+    Returns:
+        OpenAI | CassetteClient: The client configured from the environment
+        (.env is loaded lazily).
+    """
+    global _openai_client
+    if _openai_client is None:
+        from dotenv import load_dotenv
+        from llm_cassette import cassette_from_env
+        load_dotenv()  # Load environment variables from .env file
+        # With AI_ASSISTANT_CASSETTE set, calls are recorded to or replayed from a cassette
+        _openai_client = cassette_from_env(_build_openai_client) or _build_openai_client()
+    return _openai_client
+
+
+def _build_openai_client():
+    from openai import OpenAI
+    from rate_limiter import RateLimitedClient
+    # The SDK's own retries would bypass the shared limiter; RateLimitedClient retries 429s itself
+    return RateLimitedClient(OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0))
+
+
+def reset_openai_client():
+    """Drops the shared client so the next call picks up changed environment settings."""
+    global _openai_client
+    _openai_client = None
@@ -0,0 +1,442 @@
+# code_metrics.py
+"""
+Fast code-quality metrics for JS/JSX, used as calculate_reward's code_quality_metrics.
+
+- Cyclomatic complexity: a single-pass tokenizer feeds a scanner that tracks
+  function bodies and counts branch points (if/for/while/case/catch/&&/||/??/?:)
+  in each one.
+- Duplication: token windows of normalized tokens are fingerprinted with a
+  Rabin-Karp rolling hash; windows of the target file that also occur elsewhere
+  in the project (or twice in the file) are grouped into duplicated blocks.
+
+Per-file results are cached by content hash (in memory and on disk) and files
+are analyzed in a process pool, so only changed files cost anything.
+"""
+import hashlib
+import os
+import pickle
+import re
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+METRICS_CACHE_FILE = 'code_metrics_cache.pkl'
+# Bump when tokenize/analyze_source change, so cached analyses from older versions are dropped
+ANALYSIS_VERSION = 2
+JS_EXTENSIONS = ('.js', '.jsx')
+IGNORED_DIRS = {'node_modules', '.git', '.next', 'dist', 'build', 'coverage'}
+
+SHINGLE_SIZE = 30       # tokens per duplication window
+SAMPLE_MOD = 4          # keep windows whose hash % SAMPLE_MOD == 0
+HASH_BASE = 1_000_003
+HASH_MOD = (1 << 61) - 1
+POOL_THRESHOLD = 32     # below this many uncached files, analyze inline
+
+BRANCH_KEYWORDS = {'if', 'for', 'while', 'case', 'catch'}
+BRANCH_OPERATORS = {'&&', '||', '??', '?'}
+CONTROL_KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'with', 'return', 'typeof', 'function'}
+# Longest first so multi-character operators win
+PUNCTUATORS = sorted(['>>>=', '...', '===', '!==', '**=', '<<=', '>>=', '>>>', '&&=', '||=', '??=',
+                      '=>', '==', '!=', '<=', '>=', '&&', '||', '??', '?.', '++', '--', '+=', '-=', '*=',
+                      '/=', '%=', '&=', '|=', '^=', '**', '<<', '>>'], key=len, reverse=True)
+TOKEN_PATTERN = re.compile(r"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<id>[^\W\d][\w$]*|\$[\w$]*)
+  | (?P<num>\d[\w.]*)
+  | (?P<str>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?|`(?:\\.|[^`\\])*`?)
+  | (?P<punct>""" + '|'.join(re.escape(punct) for punct in PUNCTUATORS) + r"""|.)
+""", re.VERBOSE | re.DOTALL)
+REGEX_LITERAL_PATTERN = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])*/?[A-Za-z]*")
+# After these tokens a '/' starts a regex literal rather than a division
+REGEX_PRECEDERS = {'(', ',', '=', ':', '[', '!', '&', '|', '?', '{', '}', ';', '&&', '||', '??', '=>',
+                   'return', 'typeof', 'case', '==', '===', '!=', '!==', '+', '-', '*', '%'}
+# After these tokens a '<' followed by a tag name or '>' opens a JSX element rather than comparing
+JSX_PRECEDERS = {'(', ',', '=', ':', '[', '!', '?', '{', '}', ';', '&&', '||', '??', '=>', 'return', 'default'}
+JSX_TAG_START_PATTERN = re.compile(r'[A-Za-z_$>]')
+JSX_TEXT_PATTERN = re.compile(r'[^<{]+')
+
+_memory_cache = {}
+
+
+def tokenize(source):
+    """
+    Splits JS/JSX source into (kind, text) tokens in a single pass.
+    Kinds are 'id', 'num', 'str' and 'punct'; comments and whitespace are dropped.
+    Text between JSX tags becomes a single 'str' token, so an apostrophe or '?'
+    in it isn't read as code.
+    """
+    tokens = []
+    append = tokens.append
+    match_token = TOKEN_PATTERN.match
+    pos, n = 0, len(source)
+    # Open JSX constructs, innermost last: [mode, brace depth] with mode 'tag' (inside <...>, including
+    # closing tags as 'close'), 'children' (between tags) or 'expr' (a {...} container in children)
+    jsx = []
+    while pos < n:
+        char = source[pos]
+        mode = jsx[-1][0] if jsx else None
+        if mode == 'children':
+            if char == '<':
+                jsx.append(['close' if source[pos + 1:pos + 2] == '/' else 'tag', 0])
+                append(('punct', '<'))
+                pos += 1
+            elif char == '{':
+                jsx.append(['expr', 0])
+                append(('punct', '{'))
+                pos += 1
+            else:
+                match = JSX_TEXT_PATTERN.match(source, pos)
+                if match.group().strip():
+                    append(('str', match.group().strip()))
+                pos = match.end()
+            continue
+
+        in_tag = mode in ('tag', 'close') and jsx[-1][1] == 0
+        if in_tag and char == '>':
+            self_closing = tokens[-1] == ('punct', '/')
+            jsx.pop()
+            if mode == 'close':
+                jsx.pop()  # The element's children end with its closing tag
+            elif not self_closing:
+                jsx.append(['children', 0])
+            append(('punct', '>'))
+            pos += 1
+            continue
+        if char == '<' and not in_tag and (not tokens or tokens[-1][1] in JSX_PRECEDERS) \
+                and JSX_TAG_START_PATTERN.match(source, pos + 1):
+            jsx.append(['tag', 0])
+            append(('punct', '<'))
+            pos += 1
+            continue
+        if jsx and char in '{}':
+            if char == '{':
+                jsx[-1][1] += 1
+            elif jsx[-1][1]:
+                jsx[-1][1] -= 1
+            elif mode == 'expr':
+                jsx.pop()
+            append(('punct', char))
+            pos += 1
+            continue
+        if char == '/' and not in_tag and (not tokens or tokens[-1][1] in REGEX_PRECEDERS) \
+                and source[pos + 1:pos + 2] not in ('/', '*'):
+            match = REGEX_LITERAL_PATTERN.match(source, pos)
+            append(('str', match.group()))
+            pos = match.end()
+            continue
+        match = match_token(source, pos)
+        kind = match.lastgroup
+        if kind != 'skip':
+            append((kind, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def function_complexities(tokens):
+    """
+    Computes the cyclomatic complexity of every function in a token stream.
+
+    Returns:
+        list: (function name, complexity) pairs; branches outside any function
+        are reported under '<module>'.
+    """
+    finished = []
+    module = ['<module>', 1]
+    functions = []          # stack of [name, complexity, brace depth of the body]
+    paren_owners = []       # for each open '(', the token before it
+    last_closed_owner = None
+    pending_name = None     # name of a function whose body '{' is expected next
+    depth = 0
+
+    for index, (kind, text) in enumerate(tokens):
+        current = functions[-1] if functions else module
+        if kind == 'id':
+            if text in BRANCH_KEYWORDS:
+                current[1] += 1
+            elif text == 'function':
+                following = tokens[index + 1] if index + 1 < len(tokens) else None
+                pending_name = following[1] if following and following[0] == 'id' else '<anonymous>'
+            continue
+        if kind != 'punct':
+            continue
+
+        if text in BRANCH_OPERATORS:
+            current[1] += 1
+        elif text == '(':
+            paren_owners.append(tokens[index - 1] if index else None)
+        elif text == ')':
+            last_closed_owner = paren_owners.pop() if paren_owners else None
+        elif text == '=>':
+            name = tokens[index - 1][1] if index and tokens[index - 1][0] == 'id' else None
+            if name is None:
+                # (a, b) => ...: name it after the variable it's assigned to, if any
+                name = _arrow_name(tokens, index)
+            # Expression-bodied arrows are counted in the enclosing function
+            if index + 1 < len(tokens) and tokens[index + 1][1] == '{':
+                pending_name = name
+        elif text == '{':
+            depth += 1
+            previous = tokens[index - 1] if index else None
+            if pending_name is not None and previous and previous[1] in (')', '=>'):
+                functions.append([pending_name, 1, depth])
+                pending_name = None
+            elif previous and previous[1] == ')' and last_closed_owner and last_closed_owner[0] == 'id' \
+                    and last_closed_owner[1] not in CONTROL_KEYWORDS:
+                # Method shorthand: name(args) { ... }
+                functions.append([last_closed_owner[1], 1, depth])
+        elif text == '}':
+            if functions and functions[-1][2] == depth:
+                name, complexity, _ = functions.pop()
+                finished.append((name, complexity))
+            depth -= 1
+
+    while functions:
+        name, complexity, _ = functions.pop()
+        finished.append((name, complexity))
+    if module[1] > 1 or not finished:
+        finished.append(tuple(module))
+    return finished
+
+
+def _arrow_name(tokens, arrow_index):
+    # Walk back over the parameter list to "const name = (...)"
+    depth = 0
+    for j in range(arrow_index - 1, -1, -1):
+        text = tokens[j][1]
+        if text == ')':
+            depth += 1
+        elif text == '(':
+            depth -= 1
+            if depth == 0:
+                if j >= 2 and tokens[j - 1][1] == '=' and tokens[j - 2][0] == 'id':
+                    return tokens[j - 2][1]
+                if j >= 3 and tokens[j - 1][1] == 'async' and tokens[j - 2][1] == '=':
+                    return tokens[j - 3][1]
+                return '<arrow>'
+    return '<arrow>'
+
+
+def fingerprints(tokens, shingle_size=SHINGLE_SIZE, sample_mod=SAMPLE_MOD):
+    """
+    Rabin-Karp rolling hashes of every window of `shingle_size` normalized
+    tokens, keeping only those with hash % sample_mod == 0.
+
+    Returns:
+        tuple: (array of window start positions, array of window hashes)
+    """
+    positions, hashes = array('I'), array('Q')
+    if len(tokens) < shingle_size:
+        return positions, hashes
+
+    # Identifiers, numbers and strings are normalized so renamed copies still match
+    values = []
+    token_values = {}
+    for token in tokens:
+        value = token_values.get(token)
+        if value is None:
+            kind, text = token
+            value = zlib.crc32((text if kind == 'punct' or text in BRANCH_KEYWORDS else kind).encode('utf-8'))
+            token_values[token] = value
+        values.append(value)
+    high = pow(HASH_BASE, shingle_size - 1, HASH_MOD)
+    rolling = 0
+    for value in values[:shingle_size]:
+        rolling = (rolling * HASH_BASE + value) % HASH_MOD
+    for start in range(len(values) - shingle_size + 1):
+        if start:
+            rolling = ((rolling - values[start - 1] * high) * HASH_BASE + values[start + shingle_size - 1]) % HASH_MOD
+        if rolling % sample_mod == 0:
+            positions.append(start)
+            hashes.append(rolling)
+    return positions, hashes
+
+
+def analyze_source(source):
+    """Tokenizes source once and returns its function complexities and duplication fingerprints."""
+    tokens = tokenize(source)
+    positions, hashes = fingerprints(tokens)
+    return {
+        'functions': function_complexities(tokens),
+        'token_count': len(tokens),
+        'fp_positions': positions,
+        'fp_hashes': hashes,
+    }
+
+
+def _analyze_file(path):
+    # Runs in worker processes
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    return path, digest, analyze_source(data.decode('utf-8', errors='replace'))
+
+
+def find_source_files(project_dir):
+    """Lists the project's JS/JSX files, skipping dependency and build directories."""
+    files = []
+    for root, dirs, names in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        files.extend(os.path.join(root, name) for name in names if name.endswith(JS_EXTENSIONS))
+    return files
+
+
+class MetricsEngine:
+    """
+    Computes code-quality metrics for a file in the context of its project.
+
+    Args:
+        cache_file (str, optional): On-disk cache of per-file results keyed by
+            content hash. None keeps the cache in memory only.
+        max_workers (int, optional): Process pool size.
+    """
+
+    def __init__(self, cache_file=METRICS_CACHE_FILE, max_workers=None):
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self._by_hash = _memory_cache
+        self._by_path = {}      # path -> (mtime, size, content hash)
+        self._dirty = False
+        # Incrementally maintained fingerprint counts of the indexed project files
+        self._indexed = {}      # path -> content hash contributing to _hash_counts
+        self._hash_counts = {}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    saved = pickle.load(f)
+                if isinstance(saved, dict) and saved.get('version') == ANALYSIS_VERSION:
+                    self._by_hash.update(saved['results'])
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+
+    def analyze_files(self, paths):
+        """
+        Returns the per-file analysis of every path, using cached results for
+        files whose content hash was seen before.
+        """
+        results, to_analyze = {}, []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            known = self._by_path.get(path)
+            if known and known[:2] == (stat.st_mtime, stat.st_size) and known[2] in self._by_hash:
+                results[path] = self._by_hash[known[2]]
+                continue
+            to_analyze.append((path, stat))
+
+        if to_analyze:
+            stats = dict(to_analyze)
+            uncached = []
+            for path, stat in to_analyze:
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                if digest in self._by_hash:
+                    self._by_path[path] = (stat.st_mtime, stat.st_size, digest)
+                    results[path] = self._by_hash[digest]
+                else:
+                    uncached.append(path)
+
+            if len(uncached) >= POOL_THRESHOLD:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                    analyzed = list(pool.map(_analyze_file, uncached, chunksize=64))
+            else:
+                analyzed = [_analyze_file(path) for path in uncached]
+
+            for path, digest, result in analyzed:
+                stat = stats[path]
+                self._by_hash[digest] = result
+                self._by_path[path] = (stat.st_mtime, stat.st_size, digest)
+                results[path] = result
+            self._dirty = self._dirty or bool(analyzed)
+        return results
+
+    def compute(self, project_dir, target_file, target_content=None):
+        """
+        Computes the metrics of one file.
+
+        Args:
+            project_dir (str): The project root; all its JS/JSX files are used for duplication.
+            target_file (str): The file being scored.
+            target_content (str, optional): Content to score instead of what is on disk.
+
+        Returns:
+            dict: {'cyclomatic_complexity' (max per function), 'avg_complexity',
+            'code_duplication' (duplicated blocks), 'functions'}
+        """
+        target_file = os.path.abspath(target_file)
+        others = [path for path in map(os.path.abspath, find_source_files(project_dir)) if path != target_file]
+        analyses = self.analyze_files(others)
+
+        if target_content is not None:
+            target = analyze_source(target_content)
+        else:
+            target = self.analyze_files([target_file]).get(target_file) or analyze_source('')
+        self.save()
+
+        self._update_index(analyses)
+
+        complexities = [complexity for _name, complexity in target['functions']]
+        return {
+            'cyclomatic_complexity': max(complexities) if complexities else 0,
+            'avg_complexity': sum(complexities) / len(complexities) if complexities else 0,
+            'code_duplication': count_duplicated_blocks(target, self._hash_counts),
+            'functions': target['functions'],
+        }
+
+    def _update_index(self, analyses):
+        # Only files that were added, removed or changed since the last call are touched
+        for path in [path for path in self._indexed if path not in analyses]:
+            self._adjust_counts(self._by_hash.get(self._indexed.pop(path)), -1)
+        for path, analysis in analyses.items():
+            digest = self._by_path[path][2]
+            previous = self._indexed.get(path)
+            if previous == digest:
+                continue
+            if previous is not None:
+                self._adjust_counts(self._by_hash.get(previous), -1)
+            self._adjust_counts(analysis, 1)
+            self._indexed[path] = digest
+
+    def _adjust_counts(self, analysis, delta):
+        if analysis is None:
+            return
+        counts = self._hash_counts
+        for value in set(analysis['fp_hashes']):
+            remaining = counts.get(value, 0) + delta
+            if remaining > 0:
+                counts[value] = remaining
+            else:
+                counts.pop(value, None)
+
+    def save(self):
+        if not self.cache_file or not self._dirty:
+            return
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'version': ANALYSIS_VERSION, 'results': self._by_hash}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+
+
+def count_duplicated_blocks(target, project_hashes, shingle_size=SHINGLE_SIZE):
+    """
+    Counts blocks of the target that also occur elsewhere in the project or
+    repeat within the target. Overlapping duplicated windows form one block.
+    """
+    seen_in_target = {}
+    for position, value in zip(target['fp_positions'], target['fp_hashes']):
+        seen_in_target.setdefault(value, []).append(position)
+
+    duplicated_positions = sorted(
+        position
+        for value, positions in seen_in_target.items()
+        for position in (positions if value in project_hashes else positions[1:])
+    )
+
+    blocks, block_end = 0, -1
+    for position in duplicated_positions:
+        if position > block_end:
+            blocks += 1
+        block_end = max(block_end, position + shingle_size)
+    return blocks
@@ -4,6 +4,7 @@ import subprocess
 from rich.console import Console
 import openai
 from rich.panel import Panel
+from tracing import span, record_llm_usage
 
 console = Console()
 
@@ -58,14 +59,16 @@ def generate_code_from_plan(plan):
     """
 
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=1500,
-            temperature=0,
-            n=1,
-            stop=None,
-        )
+        with span('llm.generate_code_from_plan', model="text-davinci-003") as llm_span:
+            response = openai.Completion.create(
+                engine="text-davinci-003",
+                prompt=prompt,
+                max_tokens=1500,
+                temperature=0,
+                n=1,
+                stop=None,
+            )
+            record_llm_usage(llm_span, response)
         generated_code = response.choices[0].text.strip()
         console.print(Panel(generated_code, title="Generated Code", style="green"))
         return generated_code
@@ -99,14 +102,16 @@ def modify_code(code):
     """
 
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=1500,
-            temperature=0,
-            n=1,
-            stop=None,
-        )
+        with span('llm.modify_code', model="text-davinci-003") as llm_span:
+            response = openai.Completion.create(
+                engine="text-davinci-003",
+                prompt=prompt,
+                max_tokens=1500,
+                temperature=0,
+                n=1,
+                stop=None,
+            )
+            record_llm_usage(llm_span, response)
         modified_code = response.choices[0].text.strip()
         console.print(Panel(modified_code, title="Modified Code", style="green"))
         return modified_code
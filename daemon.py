@@ -0,0 +1,367 @@
+# daemon.py
+"""
+Long-running assistant daemon.
+
+Keeps the expensive state warm between tasks: the decoded project index, one
+SQLite connection per worker thread, the OpenAI client (and its HTTP
+connection pool), the Q-table, the reward/verification caches and a
+dedicated lint worker. Tasks are accepted as JSON over localhost HTTP or a
+Unix socket.
+
+API:
+    GET  /health          -> daemon status
+    POST /tasks           {"project_dir": ..., "task_description": ..., "wait": true,
+                           "priority": "interactive" | "batch"}
+                          -> task result (or {"task_id": ...} with "wait": false)
+    GET  /tasks/<id>      -> status/result of a task
+    POST /reload          -> reload Q-table and caches without dropping in-flight tasks
+    POST /shutdown        -> finish in-flight tasks, save the Q-table and exit
+
+SIGHUP reloads, SIGTERM/SIGINT shut down gracefully.
+"""
+import itertools
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ACTIONS = ['proceed', 'modify', 'regenerate']
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_FINISHED_TASKS = 1000
+
+
+class _LockedAgent:
+    # Serializes access to one RLAgent shared by all worker threads
+    def __init__(self, agent):
+        self._agent = agent
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._agent, name)
+        if not callable(attribute):
+            return attribute
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return locked
+
+
+class WarmState:
+    """Everything that is loaded once and reused by every task."""
+
+    def __init__(self):
+        import main
+        import database
+        from clients import get_openai_client
+
+        database.setup_database()
+        agent = main.RLAgent(ACTIONS)
+        agent.load_q_table()
+        self.agent = _LockedAgent(agent)
+        self.client = get_openai_client()
+        # eslint/npm runs are funnelled through one worker instead of one process per client
+        self.lint_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lint-worker')
+        self._reward_services = {}
+        self._metrics_engines = {}
+        self._reward_services_lock = threading.Lock()
+        self._active_tasks = 0
+        self._idle = threading.Condition()
+        self.loaded_at = time.time()
+
+    def begin_task(self):
+        with self._idle:
+            self._active_tasks += 1
+
+    def end_task(self):
+        with self._idle:
+            self._active_tasks -= 1
+            self._idle.notify_all()
+
+    def reward_service(self, project_dir):
+        import main
+        from reward_service import RewardService
+
+        project_dir = os.path.abspath(project_dir)
+        with self._reward_services_lock:
+            service = self._reward_services.get(project_dir)
+            if service is None:
+                service = RewardService(
+                    project_dir,
+                    run_tests=self._on_lint_worker(main.run_tests, timed=True),
+                    run_linter=self._on_lint_worker(main.run_linter),
+                )
+                self._reward_services[project_dir] = service
+            return service
+
+    def metrics_engine(self, project_dir):
+        from code_metrics import MetricsEngine
+
+        project_dir = os.path.abspath(project_dir)
+        with self._reward_services_lock:
+            engine = self._metrics_engines.get(project_dir)
+            if engine is None:
+                engine = self._metrics_engines[project_dir] = MetricsEngine()
+            return engine
+
+    def _on_lint_worker(self, func, timed=False):
+        # Runs func on the lint worker, tagging its spans with the calling task's request
+        # so flush_spans in that task picks them up. timed appends func's duration to its
+        # result, measured on the worker so time spent queued isn't counted
+        from tracing import get_request_id, set_request_id
+
+        lint_worker = self.lint_worker
+
+        def call(*args, **kwargs):
+            request_id = get_request_id()
+
+            def run():
+                set_request_id(request_id)
+                started = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                    return (*result, time.perf_counter() - started) if timed else result
+                finally:
+                    set_request_id(None)
+            return lint_worker.submit(run).result()
+        return call
+
+    def close(self):
+        """Waits for the tasks using this state to finish, then saves the Q-table."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._active_tasks == 0)
+        self.lint_worker.shutdown(wait=True)
+        self.agent.save_q_table()
+
+
+class AssistantDaemon:
+    """
+    Accepts tasks and runs them on a fixed pool of worker threads.
+
+    Args:
+        workers (int): Number of tasks processed concurrently.
+    """
+
+    def __init__(self, workers=4):
+        import main
+        import database
+        from async_logging import setup_logging
+
+        # Nothing is rendered to a terminal; output only goes to the log
+        os.environ.setdefault('AI_ASSISTANT_HEADLESS', '1')
+        main.console.set_quiet()
+        setup_logging()
+        database.enable_persistent_connections()
+        self._main = main
+        self.state = WarmState()
+        self._state_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task-worker')
+        self.started_at = time.time()
+        self.tasks = {}
+        # Tasks on the same project save, hash and test the same files in place, so they run one at a time
+        self._project_locks = {}
+        self._task_ids = itertools.count(1)
+        self._tasks_lock = threading.Lock()
+        self.servers = []
+        self._stopped = threading.Event()
+
+    def submit(self, project_dir, task_description, priority='interactive'):
+        if not os.path.isdir(project_dir):
+            raise ValueError(f"Project directory does not exist: {project_dir}")
+        if not task_description:
+            raise ValueError("task_description is required")
+
+        with self._tasks_lock:
+            task_id = next(self._task_ids)
+            self.tasks[task_id] = {'task_id': task_id, 'status': 'queued', 'submitted_at': time.time()}
+            self._prune_finished_tasks()
+        future = self.executor.submit(self._run, task_id, project_dir, task_description, priority)
+        return task_id, future
+
+    def _run(self, task_id, project_dir, task_description, priority):
+        from rate_limiter import BATCH, INTERACTIVE, request_priority
+
+        with self._state_lock:
+            # Tasks keep the state they started with, even if a reload swaps it meanwhile
+            state = self.state
+            state.begin_task()
+        self.tasks[task_id]['status'] = 'running'
+        start = time.perf_counter()
+        try:
+            # Interactive clients' LLM calls are admitted ahead of batch work
+            with request_priority(BATCH if priority == 'batch' else INTERACTIVE), self._project_lock(project_dir):
+                result = self._main.run_task(project_dir, task_description, state.agent, interactive=False,
+                                             reward_service=state.reward_service(project_dir),
+                                             metrics_engine=state.metrics_engine(project_dir))
+        except Exception as e:
+            result = {'status': 'failed', 'error': str(e)}
+        finally:
+            state.end_task()
+        result['task_id'] = task_id
+        result['duration_s'] = time.perf_counter() - start
+        self.tasks[task_id].update(result)
+        return self.tasks[task_id]
+
+    def _project_lock(self, project_dir):
+        with self._tasks_lock:
+            return self._project_locks.setdefault(os.path.abspath(project_dir), threading.Lock())
+
+    def _prune_finished_tasks(self):
+        finished = [task_id for task_id, task in self.tasks.items() if task['status'] not in ('queued', 'running')]
+        for task_id in finished[:max(0, len(self.tasks) - MAX_FINISHED_TASKS)]:
+            del self.tasks[task_id]
+
+    def reload(self):
+        """
+        Builds fresh warm state once in-flight tasks are done.
+
+        New tasks wait while the old state drains and saves its Q-table, so the new
+        state loads every update instead of racing the old one to q_table.pkl.
+        """
+        import clients
+
+        from tracing import flush_spans
+
+        with self._state_lock:
+            self.state.close()
+            # Nothing is running now, so the only unclaimed span is the final Q-table save
+            flush_spans()
+            self._main._decoded_files.clear()
+            clients.reset_openai_client()
+            self.state = WarmState()
+
+    def health(self):
+        with self._tasks_lock:
+            statuses = [task['status'] for task in self.tasks.values()]
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'uptime_s': time.time() - self.started_at,
+            'state_loaded_at': self.state.loaded_at,
+            'q_table_rows': self.state.agent.encoder.size,
+            'tasks_running': statuses.count('running'),
+            'tasks_queued': statuses.count('queued'),
+            'tasks_completed': statuses.count('completed'),
+            'tasks_failed': statuses.count('failed'),
+        }
+
+    def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        """Serves the JSON API until shutdown() is called or a termination signal arrives."""
+        handler = _make_handler(self)
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.servers.append(_UnixHTTPServer(socket_path, handler))
+        if port is not None:
+            self.servers.append(ThreadingHTTPServer((host, port), handler))
+        for server in self.servers:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name='daemon-server', daemon=True).start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self._request_shutdown())
+            signal.signal(signal.SIGINT, lambda *_: self._request_shutdown())
+            if hasattr(signal, 'SIGHUP'):
+                signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=self.reload, daemon=True).start())
+
+        self._stopped.wait()
+        self._shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+    def _request_shutdown(self):
+        self._stopped.set()
+
+    def shutdown(self):
+        self._request_shutdown()
+
+    def _shutdown(self):
+        import database
+
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.executor.shutdown(wait=True)
+        self.state.close()
+        database.close_persistent_connections()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, daemon.health())
+            elif self.path.startswith('/tasks/'):
+                try:
+                    task = daemon.tasks.get(int(self.path.rsplit('/', 1)[1]))
+                except ValueError:
+                    task = None
+                self._send(200, task) if task else self._send(404, {'error': 'Unknown task'})
+            else:
+                self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            if self.path == '/tasks':
+                try:
+                    body = self._read_json()
+                    task_id, future = daemon.submit(body.get('project_dir', ''), body.get('task_description', ''),
+                                                    body.get('priority', 'interactive'))
+                except (ValueError, json.JSONDecodeError) as e:
+                    self._send(400, {'error': str(e)})
+                    return
+                if body.get('wait', True):
+                    self._send(200, future.result())
+                else:
+                    self._send(202, {'task_id': task_id, 'status': 'queued'})
+            elif self.path == '/reload':
+                daemon.reload()
+                self._send(200, {'status': 'reloaded'})
+            elif self.path == '/shutdown':
+                self._send(200, {'status': 'shutting down'})
+                daemon.shutdown()
+            else:
+                self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _send(self, status, payload):
+            data = json.dumps(payload, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+        def log_message(self, format, *args):
+            import logging
+            logging.info("daemon %s - " + format, self.address_string(), *args)
+
+    return Handler
+
+
+def run_daemon(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, workers=4, retention_interval=None):
+    daemon = AssistantDaemon(workers=workers)
+    retention_job = None
+    if retention_interval:
+        from retention import RetentionJob
+        retention_job = RetentionJob(retention_interval).start()
+    try:
+        daemon.serve(host=host, port=port, socket_path=socket_path)
+    finally:
+        if retention_job is not None:
+            retention_job.stop()
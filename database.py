@@ -1,13 +1,69 @@
 import sqlite3
 import json
+import threading
+
+from tracing import traced
 
 DATABASE_FILE = 'ai_assistant.db'
+# Must run before anything creates the file: it only takes effect for a new database.
+# Existing ones are converted with retention.enable_incremental_vacuum
+AUTO_VACUUM_PRAGMA = "PRAGMA auto_vacuum = INCREMENTAL"
+
+# Long-running processes (the daemon) keep one connection per thread open
+_persistent_enabled = False
+_persistent_local = threading.local()
+_persistent_connections = []
+_persistent_lock = threading.Lock()
+
+class _KeepAliveConnection(sqlite3.Connection):
+    # close() is a no-op so existing helpers can keep calling it; see close_persistent_connections
+    def close(self):
+        pass
+
+    def close_for_real(self):
+        super().close()
 
 def get_connection():
+    if _persistent_enabled:
+        return _get_persistent_connection()
     conn = sqlite3.connect(DATABASE_FILE)
+    conn.execute(AUTO_VACUUM_PRAGMA)
+    conn.execute("PRAGMA foreign_keys = 1")  # Enable foreign key constraints
+    return conn
+
+def _get_persistent_connection():
+    conn = getattr(_persistent_local, 'conn', None)
+    if conn is not None and _persistent_local.database_file == DATABASE_FILE:
+        if conn.in_transaction:
+            # A previous call failed before committing; don't let its changes leak into this one
+            conn.rollback()
+        return conn
+    # check_same_thread is off only so close_persistent_connections can close them from one place
+    conn = sqlite3.connect(DATABASE_FILE, factory=_KeepAliveConnection, timeout=30, check_same_thread=False)
+    conn.execute(AUTO_VACUUM_PRAGMA)  # Before journal_mode, which creates the file
     conn.execute("PRAGMA foreign_keys = 1")  # Enable foreign key constraints
+    conn.execute("PRAGMA journal_mode = WAL")  # Readers don't block the writer
+    _persistent_local.conn = conn
+    _persistent_local.database_file = DATABASE_FILE
+    with _persistent_lock:
+        _persistent_connections.append(conn)
     return conn
 
+def enable_persistent_connections():
+    """Reuses one open connection per thread instead of connecting on every call."""
+    global _persistent_enabled
+    _persistent_enabled = True
+
+def close_persistent_connections():
+    # Only call once no other thread is using the database
+    global _persistent_enabled
+    _persistent_enabled = False
+    with _persistent_lock:
+        for conn in _persistent_connections:
+            conn.close_for_real()
+        _persistent_connections.clear()
+    _persistent_local.__dict__.clear()
+
 def setup_database():
     conn = get_connection()
     cur = conn.cursor()
@@ -49,10 +105,65 @@ def setup_database():
             FOREIGN KEY (request_id) REFERENCES Requests(id)
         )
     ''')
+    # Covers the time-bucketed reward queries in analysis.py without touching the table
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_rldata_timestamp_reward ON RLData(timestamp, reward)')
+    
+    # Create Timings table (one row per traced span)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS Timings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id INTEGER,
+            name TEXT,
+            parent TEXT,
+            start_time REAL,
+            duration_ms REAL,
+            thread_id INTEGER,
+            attributes TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (request_id) REFERENCES Requests(id)
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_timings_request ON Timings(request_id)')
+
+    # Create TaskSignatures and TaskBuckets tables (MinHash/LSH index of requests, see similarity_index)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS TaskSignatures (
+            request_id INTEGER PRIMARY KEY,
+            content_hash TEXT,
+            signature BLOB,
+            FOREIGN KEY (request_id) REFERENCES Requests(id)
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS TaskBuckets (
+            bucket TEXT,
+            request_id INTEGER,
+            FOREIGN KEY (request_id) REFERENCES Requests(id)
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_task_buckets_bucket ON TaskBuckets(bucket)')
+
+    # Create VerificationCache table (lint/test outcomes keyed by content hash)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS VerificationCache (
+            content_hash TEXT PRIMARY KEY,
+            tests_passed INTEGER,
+            lint_errors INTEGER,
+            test_output TEXT,
+            lint_output TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            test_duration REAL
+        )
+    ''')
+    # Databases created before test_duration was recorded
+    columns = [row[1] for row in cur.execute('PRAGMA table_info(VerificationCache)')]
+    if 'test_duration' not in columns:
+        cur.execute('ALTER TABLE VerificationCache ADD COLUMN test_duration REAL')
     
     conn.commit()
     conn.close()
 
+@traced('db.insert_request')
 def insert_request(human_request, task_description, file_path, original_content):
     conn = get_connection()
     cur = conn.cursor()
@@ -65,6 +176,7 @@ def insert_request(human_request, task_description, file_path, original_content)
     conn.close()
     return request_id
 
+@traced('db.insert_code_generation')
 def insert_code_generation(request_id, version, generated_content):
     conn = get_connection()
     cur = conn.cursor()
@@ -75,6 +187,7 @@ def insert_code_generation(request_id, version, generated_content):
     conn.commit()
     conn.close()
 
+@traced('db.insert_rl_data')
 def insert_rl_data(request_id, state, action, reward, next_state):
     conn = get_connection()
     cur = conn.cursor()
@@ -95,4 +208,53 @@ def get_all_rl_data():
     rl_data = cur.fetchall()
     conn.close()
     # Deserialize state and next_state JSON strings back to tuples
-    return [(json.loads(state), action, reward, json.loads(next_state)) for state, action, reward, next_state in rl_data]
\ No newline at end of file
+    return [(json.loads(state), action, reward, json.loads(next_state)) for state, action, reward, next_state in rl_data]
+
+def insert_timings(rows):
+    # rows: (request_id, name, parent, start_time, duration_ms, thread_id, attributes_json)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.executemany('''
+        INSERT INTO Timings (request_id, name, parent, start_time, duration_ms, thread_id, attributes)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+def get_timings(request_id=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    query = 'SELECT request_id, name, parent, start_time, duration_ms, thread_id, attributes FROM Timings'
+    if request_id is not None:
+        cur.execute(query + ' WHERE request_id = ? ORDER BY start_time', (request_id,))
+    else:
+        cur.execute(query + ' ORDER BY start_time')
+    timings = cur.fetchall()
+    conn.close()
+    return timings
+
+def insert_verification_result(content_hash, tests_passed, lint_errors, test_output, lint_output, test_duration=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute('''
+        INSERT OR REPLACE INTO VerificationCache (content_hash, tests_passed, lint_errors, test_output, lint_output,
+                                                  test_duration)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (content_hash, int(tests_passed), lint_errors, test_output, lint_output, test_duration))
+    conn.commit()
+    conn.close()
+
+def get_verification_result(content_hash):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT tests_passed, lint_errors, test_output, lint_output, test_duration
+        FROM VerificationCache WHERE content_hash = ?
+    ''', (content_hash,))
+    row = cur.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    tests_passed, lint_errors, test_output, lint_output, test_duration = row
+    return {'content_hash': content_hash, 'tests_passed': bool(tests_passed), 'test_output': test_output,
+            'lint_errors': lint_errors, 'lint_output': lint_output, 'test_duration': test_duration}
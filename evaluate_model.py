@@ -1,10 +1,10 @@
 import sqlite3
 import json
-from rich.console import Console
-from rich.table import Table
 from collections import defaultdict
 
-console = Console()
+from clients import LazyConsole
+
+console = LazyConsole()
 
 DATABASE_FILE = 'ai_assistant.db'
 
@@ -82,6 +82,8 @@ def analyze_performance(performance_data):
     }
    
 def print_performance_results(analysis):
+    from rich.table import Table
+
     console.print("[bold]AI Agent Performance Evaluation[/bold]", style="cyan")
     console.print(f"Total Requests Processed: {analysis['total_requests']}")
     console.print(f"Successful Implementations: {analysis['successful_implementations']}")
@@ -102,7 +104,91 @@ def print_performance_results(analysis):
 
     console.print(table)
 
-if __name__ == "__main__":
+def evaluate_latency(recent_runs=10):
+    """
+    Compares per-stage latency of the most recent runs against all earlier runs.
+
+    Args:
+        recent_runs (int): Number of most recent requests treated as the current run window.
+
+    Returns:
+        dict: Stage name -> {'count', 'avg_ms', 'p95_ms', 'recent_avg_ms', 'baseline_avg_ms'}.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT t.request_id, t.name, t.duration_ms
+            FROM Timings t
+            WHERE t.request_id IS NOT NULL
+            ORDER BY t.request_id
+        ''')
+        rows = cursor.fetchall()
+    except sqlite3.OperationalError:
+        # Databases created before timings were recorded have no Timings table
+        rows = []
+    conn.close()
+
+    request_ids = sorted({row['request_id'] for row in rows})
+    recent_ids = set(request_ids[-recent_runs:])
+
+    durations = defaultdict(lambda: {'all': [], 'recent': [], 'baseline': []})
+    for row in rows:
+        stage = durations[row['name']]
+        stage['all'].append(row['duration_ms'])
+        stage['recent' if row['request_id'] in recent_ids else 'baseline'].append(row['duration_ms'])
+
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    latency = {}
+    for name, stage in sorted(durations.items()):
+        ordered = sorted(stage['all'])
+        p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+        latency[name] = {
+            'count': len(ordered),
+            'avg_ms': mean(ordered),
+            'p95_ms': ordered[p95_index],
+            'recent_avg_ms': mean(stage['recent']),
+            'baseline_avg_ms': mean(stage['baseline']),
+        }
+    return latency
+
+def print_latency_results(latency):
+    from rich.table import Table
+
+    console.print("\n[bold]Stage Latency (recent runs vs. baseline):[/bold]")
+    if not latency:
+        console.print("[yellow]No timing data recorded yet.[/yellow]")
+        return
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Stage", style="dim")
+    table.add_column("Count", justify="right")
+    table.add_column("Avg (ms)", justify="right")
+    table.add_column("P95 (ms)", justify="right")
+    table.add_column("Recent (ms)", justify="right")
+    table.add_column("Baseline (ms)", justify="right")
+    table.add_column("Change", justify="right")
+
+    for name, stats in latency.items():
+        recent, baseline = stats['recent_avg_ms'], stats['baseline_avg_ms']
+        if recent is not None and baseline:
+            change = f"{(recent - baseline) / baseline * 100:+.1f}%"
+        else:
+            change = "-"
+        table.add_row(name, str(stats['count']), f"{stats['avg_ms']:.1f}", f"{stats['p95_ms']:.1f}",
+                      f"{recent:.1f}" if recent is not None else "-",
+                      f"{baseline:.1f}" if baseline is not None else "-",
+                      change)
+
+    console.print(table)
+
+def run_evaluation():
     performance_data = evaluate_ai_performance()
     analysis = analyze_performance(performance_data)
-    print_performance_results(analysis)
\ No newline at end of file
+    print_performance_results(analysis)
+    print_latency_results(evaluate_latency())
+
+if __name__ == "__main__":
+    run_evaluation()
\ No newline at end of file
@@ -0,0 +1,242 @@
+# export_parquet.py
+"""
+Streams the assistant database into date-partitioned Parquet files for offline analytics.
+
+Layout:
+    <output_dir>/<Table>/date=YYYY-MM-DD/part-<first id>-<last id>.parquet
+    <output_dir>/_watermarks.json      last exported row id per table
+
+Rows are read in id-ordered chunks through a read-only connection, so memory
+stays bounded by the chunk size. Later runs only export rows above the
+watermark. Part files are named by the chunk's id range, which depends on the
+watermark history, so a full export first removes the table's directory and
+starts again from id 0; resuming an interrupted run continues from the saved
+watermark.
+RLData states are decoded into typed columns. pandas, DuckDB and Spark read
+the output directly (hive partitioning on `date`).
+
+Requires pyarrow (pip install pyarrow).
+"""
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+import database
+from state_encoders import normalize_state
+
+WATERMARK_FILE = '_watermarks.json'
+DEFAULT_CHUNK_SIZE = 10000
+STATE_FIELDS = ('tests_passed', 'lint_errors', 'comparison', 'file_size', 'test_duration', 'lint_rules')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow. Install it with: pip install pyarrow") from None
+    return pyarrow, pyarrow.parquet
+
+
+def _parse_timestamp(value):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+def _decode_state(value):
+    # Feature dicts, or [tests_passed, lint_errors, comparison] lists in older rows
+    try:
+        state = normalize_state(value) if value else {}
+    except (TypeError, ValueError):
+        state = {}
+    decoded = []
+    for field in STATE_FIELDS:
+        item = state.get(field)
+        if field == 'lint_rules':
+            decoded.append(list(item.items()) if isinstance(item, dict) else None)
+        elif field == 'test_duration':
+            decoded.append(float(item) if isinstance(item, (int, float)) else None)
+        else:
+            decoded.append(int(item) if isinstance(item, (int, float, bool)) else None)
+    return decoded
+
+
+def _state_types(pa):
+    return {
+        'tests_passed': pa.int32(),
+        'lint_errors': pa.int32(),
+        'comparison': pa.int32(),
+        'file_size': pa.int64(),
+        'test_duration': pa.float64(),
+        'lint_rules': pa.map_(pa.string(), pa.int32()),
+    }
+
+
+def _table_specs(pa, include_content):
+    """Column definitions per table: (select expression, output column, arrow type)."""
+    content_type = pa.large_string()
+    specs = {
+        'Requests': [
+            ('id', 'id', pa.int64()),
+            ('timestamp', 'timestamp', pa.timestamp('s')),
+            ('human_request', 'human_request', pa.string()),
+            ('task_description', 'task_description', pa.string()),
+            ('file_path', 'file_path', pa.string()),
+            ('length(original_content)', 'original_content_length', pa.int64()),
+        ],
+        'CodeGenerations': [
+            ('id', 'id', pa.int64()),
+            ('request_id', 'request_id', pa.int64()),
+            ('version', 'version', pa.int32()),
+            ('timestamp', 'timestamp', pa.timestamp('s')),
+            ('length(generated_content)', 'generated_content_length', pa.int64()),
+        ],
+        'RLData': [
+            ('id', 'id', pa.int64()),
+            ('request_id', 'request_id', pa.int64()),
+            ('timestamp', 'timestamp', pa.timestamp('s')),
+            ('action', 'action', pa.dictionary(pa.int32(), pa.string())),
+            ('reward', 'reward', pa.float64()),
+            ('state', 'state', None),
+            ('next_state', 'next_state', None),
+        ],
+        'Timings': [
+            ('id', 'id', pa.int64()),
+            ('request_id', 'request_id', pa.int64()),
+            ('timestamp', 'timestamp', pa.timestamp('s')),
+            ('name', 'name', pa.dictionary(pa.int32(), pa.string())),
+            ('parent', 'parent', pa.string()),
+            ('start_time', 'start_time', pa.float64()),
+            ('duration_ms', 'duration_ms', pa.float64()),
+            ('attributes', 'attributes', pa.string()),
+        ],
+    }
+    if include_content:
+        specs['Requests'].append(('original_content', 'original_content', content_type))
+        specs['CodeGenerations'].append(('generated_content', 'generated_content', content_type))
+    return specs
+
+
+def _build_batch(pa, spec, rows):
+    columns, fields = [], []
+    for index, (_expression, name, arrow_type) in enumerate(spec):
+        values = [row[index] for row in rows]
+        if arrow_type is None:
+            # Decoded state columns
+            decoded = [_decode_state(value) for value in values]
+            state_types = _state_types(pa)
+            for position, field in enumerate(STATE_FIELDS):
+                fields.append(pa.field(f"{name}_{field}", state_types[field]))
+                columns.append(pa.array([item[position] for item in decoded], type=state_types[field]))
+            continue
+        if pa.types.is_timestamp(arrow_type):
+            values = [_parse_timestamp(value) for value in values]
+        if pa.types.is_dictionary(arrow_type):
+            columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, type=arrow_type))
+        fields.append(pa.field(name, arrow_type))
+    return pa.Table.from_arrays(columns, schema=pa.schema(fields))
+
+
+def load_watermarks(output_dir):
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_watermarks(output_dir, watermarks):
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_table(conn, table, spec, output_dir, watermark, chunk_size, pa, pq):
+    """
+    Exports rows of one table with id > watermark.
+
+    Returns:
+        tuple: (rows exported, new watermark)
+    """
+    select = ', '.join(expression for expression, _name, _type in spec)
+    timestamp_index = next(index for index, (_e, name, _t) in enumerate(spec) if name == 'timestamp')
+    exported = 0
+    while True:
+        rows = conn.execute(f'SELECT {select} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                            (watermark, chunk_size)).fetchall()
+        if not rows:
+            break
+
+        first_id, last_id = rows[0][0], rows[-1][0]
+        partitions = {}
+        for row in rows:
+            timestamp = row[timestamp_index]
+            partitions.setdefault(timestamp[:10] if timestamp else 'unknown', []).append(row)
+        for date, partition_rows in partitions.items():
+            directory = os.path.join(output_dir, table, f"date={date}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{first_id:012d}-{last_id:012d}.parquet")
+            pq.write_table(_build_batch(pa, spec, partition_rows), path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)
+
+        exported += len(rows)
+        watermark = last_id
+        if len(rows) < chunk_size:
+            break
+    return exported, watermark
+
+
+def export_database(output_dir, tables=None, chunk_size=DEFAULT_CHUNK_SIZE, full=False, include_content=False,
+                    database_file=None):
+    """
+    Exports the assistant database to partitioned Parquet.
+
+    Args:
+        output_dir (str): Export root.
+        tables (list, optional): Tables to export. Defaults to all.
+        chunk_size (int): Rows read and written per chunk.
+        full (bool): Replace the selected tables' exports with everything in the database.
+            Watermarks of other tables are kept.
+        include_content (bool): Also export full file contents (large).
+        database_file (str, optional): Defaults to database.DATABASE_FILE.
+
+    Returns:
+        dict: Rows exported per table.
+    """
+    pa, pq = _require_pyarrow()
+    specs = _table_specs(pa, include_content)
+    tables = tables or list(specs)
+    unknown = [table for table in tables if table not in specs]
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(unknown)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    watermarks = load_watermarks(output_dir)
+    # Read-only connection: the export never takes write locks on the live database
+    path = os.path.abspath(database_file or database.DATABASE_FILE)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    counts = {}
+    try:
+        for table in tables:
+            if full:
+                # Earlier parts were cut at different ids; keeping them would duplicate rows
+                watermarks[table] = 0
+                save_watermarks(output_dir, watermarks)
+                shutil.rmtree(os.path.join(output_dir, table), ignore_errors=True)
+            exported, watermarks[table] = export_table(conn, table, specs[table], output_dir,
+                                                       watermarks.get(table, 0), chunk_size, pa, pq)
+            counts[table] = exported
+            save_watermarks(output_dir, watermarks)
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,123 @@
+# file_viewer.py
+"""
+Paged, lazily highlighted code viewer.
+
+Only the visible window of a file is passed to rich's Syntax highlighter, so
+rendering cost depends on the page size rather than the file size. When the
+original content is known, a summary of the changed hunks is shown and the
+pages jump straight to them.
+"""
+import difflib
+import os
+
+PAGE_SIZE = 60
+HUNK_CONTEXT = 3
+
+
+def is_headless(console):
+    """True when output should not be rendered (explicitly disabled or not a terminal)."""
+    if os.getenv('AI_ASSISTANT_HEADLESS', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return not console.is_terminal
+
+
+def changed_hunks(original, updated):
+    """
+    Computes the changed regions between two versions of a file.
+
+    Args:
+        original (str): The original content.
+        updated (str): The updated content.
+
+    Returns:
+        list: (tag, orig_start, orig_end, new_start, new_end) tuples with
+        zero-based, end-exclusive line ranges, for every non-equal region.
+    """
+    matcher = difflib.SequenceMatcher(None, original.splitlines(), updated.splitlines(), autojunk=False)
+    return [opcode for opcode in matcher.get_opcodes() if opcode[0] != 'equal']
+
+
+def summarize_hunks(hunks):
+    """Returns one human-readable line per changed hunk."""
+    summary = []
+    for tag, i1, i2, j1, j2 in hunks:
+        if tag == 'insert':
+            summary.append(f"+ lines {j1 + 1}-{j2}: {j2 - j1} added")
+        elif tag == 'delete':
+            summary.append(f"- after line {j1}: {i2 - i1} removed (original lines {i1 + 1}-{i2})")
+        else:
+            summary.append(f"~ lines {j1 + 1}-{j2}: {i2 - i1} replaced by {j2 - j1}")
+    return summary
+
+
+def page_windows(line_count, hunks=None, page_size=PAGE_SIZE, context=HUNK_CONTEXT):
+    """
+    Splits a file into the (start, end) line windows the viewer pages through.
+    With hunks, each window covers one or more nearby changes plus context;
+    otherwise the file is split into consecutive pages.
+    """
+    if not hunks:
+        return [(start, min(start + page_size, line_count)) for start in range(0, line_count, page_size)]
+
+    windows = []
+    for _tag, _i1, _i2, j1, j2 in hunks:
+        start = max(0, j1 - context)
+        end = min(line_count, max(j2, j1 + 1) + context)
+        if windows and start <= windows[-1][1] and end - windows[-1][0] <= page_size:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            continue
+        if windows and start < windows[-1][1]:
+            start = windows[-1][1]
+        # A hunk longer than a page is shown across consecutive pages
+        windows.extend((page_start, min(end, page_start + page_size)) for page_start in range(start, end, page_size))
+    return windows
+
+
+def render_window(console, lines, start, end, title, lexer="javascript"):
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
+    syntax = Syntax("\n".join(lines[start:end]), lexer, theme="monokai", line_numbers=True,
+                    start_line=start + 1)
+    subtitle = f"lines {start + 1}-{end} of {len(lines)}"
+    console.print(Panel(syntax, title=title, subtitle=subtitle, expand=False))
+
+
+def show_code(console, content, title, original=None, page_size=PAGE_SIZE, interactive=True):
+    """
+    Displays code one window at a time.
+
+    Args:
+        console: The console to render to.
+        content (str): The code to display.
+        title (str): Panel title.
+        original (str, optional): Previous version; when given, only changed hunks are shown.
+        page_size (int): Maximum number of lines per window.
+        interactive (bool): Prompt before showing further windows.
+    """
+    if is_headless(console):
+        return
+
+    lines = content.splitlines()
+    hunks = None
+    if original is not None:
+        hunks = changed_hunks(original, content)
+        if not hunks:
+            console.print(f"[green]{title}: no changes against the original.[/green]")
+            return
+        console.print(f"[bold]{title}: {len(hunks)} changed hunk(s)[/bold]")
+        for line in summarize_hunks(hunks):
+            console.print(f"  {line}")
+
+    windows = page_windows(len(lines), hunks, page_size)
+    for index, (start, end) in enumerate(windows):
+        render_window(console, lines, start, end, title)
+        remaining = len(windows) - index - 1
+        if not remaining:
+            break
+        if not interactive:
+            console.print(f"[dim]... {remaining} more window(s) not shown[/dim]")
+            break
+        answer = console.input(f"[bold cyan]{remaining} more window(s). Press Enter to continue or 'q' to stop: [/bold cyan]")
+        if answer.strip().lower() == 'q':
+            break
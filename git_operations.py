@@ -1,22 +1,104 @@
 import os
+import shutil
+import threading
+from contextlib import contextmanager
 from git import Repo, GitCommandError, InvalidGitRepositoryError
 from rich.console import Console
 
 console = Console()
 
-def clone_or_pull_repo(repo_url, local_dir, pull_latest=False):
+WORKTREES_DIR_NAME = '.ai-worktrees'
+
+# Serializes worktree bookkeeping (.git/worktrees) between threads of this process
+_worktree_lock = threading.Lock()
+
+def _clone_url(repo_url):
+    # --depth and --filter are ignored for plain local paths; file:// URLs honour them
+    if os.path.exists(repo_url):
+        return 'file://' + os.path.abspath(repo_url)
+    return repo_url
+
+def clone_workspace(repo_url, local_dir, depth=1, blobless=True, sparse_paths=None, branch=None):
+    """
+    Clones a repository with as little data as the task needs.
+
+    Args:
+        repo_url (str): Remote URL or path to a (bare) repository.
+        local_dir (str): Target directory.
+        depth (int, optional): History depth; None for full history.
+        blobless (bool): Use a partial clone that fetches file contents on demand.
+        sparse_paths (list, optional): Only check out these directories.
+        branch (str, optional): Branch to clone instead of the remote HEAD.
+
+    Returns:
+        Repo: The cloned repository.
+    """
+    options = []
+    if depth:
+        options.append(f'--depth={depth}')
+    if blobless:
+        options.append('--filter=blob:none')
+    if sparse_paths:
+        options.append('--sparse')
+    if branch:
+        options.append(f'--branch={branch}')
+
+    repo = Repo.clone_from(_clone_url(repo_url), local_dir, multi_options=options)
+    if sparse_paths:
+        set_sparse_paths(local_dir, sparse_paths)
+    return repo
+
+def set_sparse_paths(local_dir, sparse_paths):
+    """Restricts the checkout of a repository or worktree to the given directories."""
+    repo = Repo(local_dir)
+    repo.git.sparse_checkout('set', '--cone', *sparse_paths)
+    return repo
+
+def update_workspace(local_dir, depth=1):
+    """
+    Fetches the tip of the current branch (shallowly) and fast-forwards to it.
+
+    Raises:
+        RuntimeError: If HEAD is detached, the checkout has uncommitted changes, or it can't be
+            fast-forwarded; the checkout is left untouched.
+    """
+    repo = Repo(local_dir)
+    if repo.head.is_detached:
+        raise RuntimeError(f"{local_dir} is on a detached HEAD; check out a branch to update it")
+    if repo.is_dirty(untracked_files=True):
+        raise RuntimeError(f"{local_dir} has uncommitted changes; commit or stash them before updating")
+    branch = repo.active_branch.name
+    tracking = f'refs/remotes/origin/{branch}'
+    # No local commits if HEAD is still the last fetched tip
+    up_to_date_before = tracking in [ref.path for ref in repo.refs] and repo.head.commit == repo.commit(tracking)
+    fetch_options = [f'--depth={depth}'] if depth else []
+    repo.git.fetch('origin', branch, *fetch_options)
+    try:
+        repo.git.merge('--ff-only', 'FETCH_HEAD')
+    except GitCommandError:
+        # A shallow fetch cuts the history, so git can't prove the fast-forward; that's only safe to force
+        # when there is nothing local to lose
+        if not up_to_date_before:
+            raise RuntimeError(f"{local_dir} has commits that aren't on origin/{branch}; "
+                               f"can't fast-forward it") from None
+        repo.git.reset('--hard', 'FETCH_HEAD')
+    return repo
+
+def clone_or_pull_repo(repo_url, local_dir, pull_latest=False, depth=1, blobless=True, sparse_paths=None):
     try:
         if os.path.exists(local_dir):
             repo = Repo(local_dir)
             if pull_latest:
                 console.print("[bold cyan]Pulling latest changes...[/bold cyan]")
-                repo.remotes.origin.pull()
+                update_workspace(local_dir, depth=depth)
                 console.print("[green]Repository updated successfully.[/green]")
             else:
                 console.print("[yellow]Using existing repository without pulling updates.[/yellow]")
+            if sparse_paths:
+                set_sparse_paths(local_dir, sparse_paths)
         else:
             console.print("[bold cyan]Cloning repository...[/bold cyan]")
-            Repo.clone_from(repo_url, local_dir)
+            clone_workspace(repo_url, local_dir, depth=depth, blobless=blobless, sparse_paths=sparse_paths)
             console.print("[green]Repository cloned successfully.[/green]")
         return True
     except InvalidGitRepositoryError:
@@ -28,3 +110,63 @@ def clone_or_pull_repo(repo_url, local_dir, pull_latest=False):
     except Exception as e:
         console.print(f"[red]An unexpected error occurred: {e}[/red]")
         return False
+
+def create_worktree(local_dir, task_id, ref='HEAD', sparse_paths=None, worktrees_dir=None):
+    """
+    Creates a detached worktree for a task so parallel tasks don't share one checkout.
+
+    Args:
+        local_dir (str): The main checkout.
+        task_id (str | int): Identifier used for the worktree directory.
+        ref (str): Commit or branch to check out.
+        sparse_paths (list, optional): Only check out these directories.
+        worktrees_dir (str, optional): Parent directory for worktrees.
+            Defaults to a hidden directory next to the main checkout.
+
+    Returns:
+        str: Path of the new worktree.
+    """
+    local_dir = os.path.abspath(local_dir)
+    if worktrees_dir is None:
+        worktrees_dir = os.path.join(os.path.dirname(local_dir), WORKTREES_DIR_NAME)
+    os.makedirs(worktrees_dir, exist_ok=True)
+    worktree_path = os.path.join(worktrees_dir, f"{os.path.basename(local_dir)}-{task_id}")
+
+    repo = Repo(local_dir)
+    with _worktree_lock:
+        if sparse_paths:
+            repo.git.worktree('add', '--detach', '--no-checkout', worktree_path, ref)
+        else:
+            repo.git.worktree('add', '--detach', worktree_path, ref)
+
+    if sparse_paths:
+        worktree = set_sparse_paths(worktree_path, sparse_paths)
+        worktree.git.checkout('--detach', ref)
+    return worktree_path
+
+def remove_worktree(local_dir, worktree_path):
+    """Discards a task worktree, including any uncommitted changes in it."""
+    repo = Repo(local_dir)
+    with _worktree_lock:
+        try:
+            repo.git.worktree('remove', '--force', worktree_path)
+        except GitCommandError:
+            # Fall back to deleting the directory and letting git forget it
+            shutil.rmtree(worktree_path, ignore_errors=True)
+            repo.git.worktree('prune')
+
+@contextmanager
+def task_worktree(local_dir, task_id, ref='HEAD', sparse_paths=None, keep=False):
+    """
+    Context manager yielding a fresh worktree path that is removed afterwards.
+
+    Example:
+        with task_worktree(repo_dir, request_id, sparse_paths=['components']) as path:
+            ...
+    """
+    worktree_path = create_worktree(local_dir, task_id, ref=ref, sparse_paths=sparse_paths)
+    try:
+        yield worktree_path
+    finally:
+        if not keep:
+            remove_worktree(local_dir, worktree_path)
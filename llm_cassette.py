@@ -0,0 +1,211 @@
+# llm_cassette.py
+"""
+Record/replay layer for chat-completion calls.
+
+In record mode every request/response pair made through the wrapped client is
+appended to a gzip-compressed JSON-lines cassette. In replay mode responses
+are served from the cassette without touching the network, matched by a hash
+of the model, sampling parameters and whitespace-normalized messages. Repeated
+identical requests replay their recordings in order.
+
+Enable it for the whole pipeline with:
+    AI_ASSISTANT_CASSETTE=llm.cassette.gz
+    AI_ASSISTANT_CASSETTE_MODE=record | replay
+    AI_ASSISTANT_CASSETTE_LATENCY=1   (optional: sleep for the recorded latency on replay)
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+# Request parameters that change the response and therefore the match
+MATCHED_PARAMS = ('model', 'temperature', 'max_tokens', 'top_p', 'n', 'stop')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+class _Namespace(dict):
+    # Dict with attribute access, standing in for OpenAI response objects on replay
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def model_dump(self):
+        return _to_plain(self)
+
+
+def _to_namespace(value):
+    if isinstance(value, dict):
+        return _Namespace({key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+def _to_plain(value):
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+def normalize_prompt(text):
+    """Collapses whitespace so indentation-only prompt changes still match."""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def request_key(kwargs):
+    """
+    Computes the match key of a chat-completion request.
+
+    Args:
+        kwargs (dict): Keyword arguments passed to `chat.completions.create`.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    messages = [{'role': message.get('role'), 'content': normalize_prompt(message.get('content'))}
+                for message in kwargs.get('messages', [])]
+    params = {name: kwargs.get(name) for name in MATCHED_PARAMS if kwargs.get(name) is not None}
+    payload = json.dumps({'messages': messages, 'params': params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """
+    On-disk store of recorded interactions.
+
+    Args:
+        path (str): Cassette file (gzip-compressed JSON lines).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._recordings = {}   # key -> list of {'response', 'latency'}
+        self._cursors = {}      # key -> index of the next recording to replay
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings.setdefault(entry['key'], []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._recordings.values())
+
+    def record(self, key, request, response, latency):
+        entry = {'key': key, 'request': request, 'response': response, 'latency': latency}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._recordings.setdefault(key, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending yields a multi-member gzip file, which gzip reads back transparently
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(line)
+
+    def next_recording(self, key):
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recording in {self.path} matches request {key[:12]}")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            # Once exhausted, keep replaying the last recording
+            return entries[min(index, len(entries) - 1)]
+
+    def rewind(self):
+        with self._lock:
+            self._cursors.clear()
+
+
+class _Completions:
+    def __init__(self, cassette_client):
+        self._owner = cassette_client
+
+    def create(self, **kwargs):
+        return self._owner._create(kwargs)
+
+
+class _Chat:
+    def __init__(self, cassette_client):
+        self.completions = _Completions(cassette_client)
+
+
+class CassetteClient:
+    """
+    Wraps an OpenAI client's `chat.completions.create` with record/replay.
+
+    Args:
+        path (str): Cassette file.
+        mode (str): 'record' or 'replay'.
+        client (optional): The real client; required when recording.
+        replay_latency (bool): On replay, sleep for the latency measured when recording.
+    """
+
+    def __init__(self, path, mode=REPLAY, client=None, replay_latency=False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {MODES}")
+        if mode == RECORD and client is None:
+            raise ValueError("Recording requires a real client")
+        self.cassette = Cassette(path)
+        self.mode = mode
+        self.client = client
+        self.replay_latency = replay_latency
+        self.chat = _Chat(self)
+
+    def _create(self, kwargs):
+        key = request_key(kwargs)
+        if self.mode == REPLAY:
+            entry = self.cassette.next_recording(key)
+            if self.replay_latency and entry.get('latency'):
+                time.sleep(entry['latency'])
+            return _to_namespace(entry['response'])
+
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(**kwargs)
+        latency = time.perf_counter() - start
+        plain = response.model_dump() if hasattr(response, 'model_dump') else _to_plain(response)
+        request = {name: kwargs.get(name) for name in MATCHED_PARAMS if kwargs.get(name) is not None}
+        request['messages'] = kwargs.get('messages', [])
+        self.cassette.record(key, request, plain, latency)
+        return response
+
+
+def cassette_from_env(make_client):
+    """
+    Builds a CassetteClient from the AI_ASSISTANT_CASSETTE* environment variables.
+
+    Args:
+        make_client (callable): Builds the real client; only called when recording.
+
+    Returns:
+        CassetteClient | None: None when no cassette is configured.
+    """
+    path = os.getenv('AI_ASSISTANT_CASSETTE')
+    if not path:
+        return None
+    mode = os.getenv('AI_ASSISTANT_CASSETTE_MODE', REPLAY).lower()
+    replay_latency = os.getenv('AI_ASSISTANT_CASSETTE_LATENCY', '').lower() in ('1', 'true', 'yes')
+    client = make_client() if mode == RECORD else None
+    return CassetteClient(path, mode=mode, client=client, replay_latency=replay_latency)
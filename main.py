@@ -1,41 +1,63 @@
 import re
 import os
 import logging
-import traceback
-from dotenv import load_dotenv
-from openai import OpenAI
-from rich.console import Console
-from rich.panel import Panel
-from rich.syntax import Syntax
 import json
 import subprocess
 import glob
-import chardet
+
+from async_logging import AsyncConsole, setup_logging
+from clients import get_openai_client
+from file_viewer import show_code
 
 # Import database and RL agent functions
 from database import setup_database, insert_request, insert_code_generation, insert_rl_data
 from rl_agent import RLAgent
-from reward_calculation import calculate_reward
+from reward_service import RewardService
+from state_encoders import lint_rule_histogram
+from tracing import span, traced, record_llm_usage, set_request_id, flush_spans
+
+# rich, chardet and the OpenAI client are imported on first use to keep startup fast.
+# Console output is rendered by a background thread; see async_logging.
+console = AsyncConsole()
 
-# Set up logging
-logging.basicConfig(filename='ai_assistant.log', level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Decoded contents of files read during the project scan, keyed by path and
+# invalidated by modification time, so later steps don't re-read and re-detect
+_decoded_files = {}
 
-load_dotenv()  # Load environment variables from .env file
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-console = Console()
+# One MetricsEngine per project, so its duplication index is updated incrementally between tasks
+_metrics_engines = {}
 
 def log_and_print(message, level='info'):
     console.print(message)
     if level == 'info':
-        logging.info(message)
+        logging.info('%s', message)
     elif level == 'error':
-        logging.error(message)
+        logging.error('%s', message)
 
 def save_data(data, filename):
     with open(filename, 'w') as f:
         json.dump(data, f)
 
+def read_file_content(file_path):
+    """
+    Reads and decodes a file with detected encoding, reusing the buffer decoded
+    by an earlier call when the file hasn't changed since.
+    """
+    import chardet
+
+    mtime = os.path.getmtime(file_path)
+    cached = _decoded_files.get(file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(file_path, 'rb') as f:
+        raw_content = f.read()
+    encoding = chardet.detect(raw_content)['encoding'] or 'utf-8'
+    content = raw_content.decode(encoding)
+    _decoded_files[file_path] = (mtime, content)
+    return content
+
+@traced('scan.find_relevant_files')
 def find_relevant_files(project_dir, task_description):
     js_files = glob.glob(os.path.join(project_dir, '**', '*.js'), recursive=True)
     jsx_files = glob.glob(os.path.join(project_dir, '**', '*.jsx'), recursive=True)
@@ -43,13 +65,8 @@ def find_relevant_files(project_dir, task_description):
     
     for file in all_files:
         try:
-            with open(file, 'rb') as f:
-                raw_content = f.read()
-            detected = chardet.detect(raw_content)
-            encoding = detected['encoding']
-            
-            content = raw_content.decode(encoding)
-            
+            content = read_file_content(file)
+
             if 'password' in content.lower() and 'input' in content.lower():
                 return file
         except Exception as e:
@@ -59,13 +76,8 @@ def find_relevant_files(project_dir, task_description):
 
 def display_file_content(file_path):
     try:
-        with open(file_path, 'rb') as file:
-            raw_content = file.read()
-        detected = chardet.detect(raw_content)
-        encoding = detected['encoding']
-        content = raw_content.decode(encoding)
-        syntax = Syntax(content, "javascript", theme="monokai", line_numbers=True)
-        console.print(Panel(syntax, title=f"Content of {os.path.basename(file_path)}", expand=False))
+        content = read_file_content(file_path)
+        show_code(console, content, f"Content of {os.path.basename(file_path)}")
     except Exception as e:
         log_and_print(f"[bold red]Error displaying file content: {e}[/bold red]", 'error')
 
@@ -133,21 +145,62 @@ Please generate the complete, updated file content implementing the requested fe
 Begin now:
 """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0
-        )
+        with span('llm.generate_complete_code', model="gpt-4") as llm_span:
+            response = get_openai_client().chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000,
+                temperature=0
+            )
+            record_llm_usage(llm_span, response)
         generated_code = response.choices[0].message.content.strip()
         return post_process_nextjs_code(generated_code)
     except Exception as e:
         log_and_print(f"[bold red]Error generating code: {e}[/bold red]", 'error')
         return None
 
+@traced('similarity.lookup')
+def reuse_prior_generation(task_description, file_content, interactive=True):
+    """
+    Looks for a near-identical earlier task on the same file content whose
+    generation scored well, and returns its code if it should be reused.
+
+    AI_ASSISTANT_REUSE controls the behaviour: 'offer' (default) asks in
+    interactive runs and reuses otherwise, 'auto' always reuses, 'off' disables it.
+    """
+    mode = os.getenv('AI_ASSISTANT_REUSE', 'offer').lower()
+    if mode == 'off':
+        return None
+    from similarity_index import find_reusable_generation
+
+    try:
+        match = find_reusable_generation(task_description, file_content)
+    except Exception as e:
+        log_and_print(f"[yellow]Similar task lookup failed: {e}[/yellow]", 'info')
+        return None
+    if not match:
+        return None
+
+    console.print(f"[bold cyan]A similar earlier task (#{match['request_id']}: \"{match['task_description']}\") "
+                  f"scored {match['reward']} ({match['similarity']:.0%} similar).[/bold cyan]")
+    if interactive and mode != 'auto':
+        answer = console.input("[bold cyan]Reuse its generated code instead of generating new code? (yes/no): [/bold cyan]")
+        if answer.lower() != 'yes':
+            return None
+    log_and_print(f"[green]Reusing generated code from request {match['request_id']}.[/green]")
+    return match['generated_content']
+
+def index_task(request_id, task_description, file_content):
+    from similarity_index import index_request
+
+    try:
+        index_request(request_id, task_description, file_content)
+    except Exception as e:
+        log_and_print(f"[yellow]Could not index task for reuse: {e}[/yellow]", 'info')
+
 def save_code_to_file(code, target_file):
     console.print("[bold cyan]Saving code to file...[/bold cyan]")
     try:
@@ -159,70 +212,85 @@ def save_code_to_file(code, target_file):
         log_and_print(f"[bold red]Error saving code to file: {e}[/bold red]", 'error')
         return False
 
+@traced('verify.run_tests')
 def run_tests(project_dir):
     console.print("[bold cyan]Running tests...[/bold cyan]")
     try:
         result = subprocess.run(['npm', 'test'], cwd=project_dir, capture_output=True, text=True)
         return result.returncode == 0, result.stdout
     except Exception as e:
-        return False, f"An error occurred while running tests: {e}"
+        # None rather than False: the tests didn't fail, they couldn't run
+        return None, f"An error occurred while running tests: {e}"
 
-def run_linter(project_dir):
+@traced('verify.run_linter')
+def run_linter(project_dir, paths=None):
     console.print("[bold cyan]Running linter...[/bold cyan]")
     try:
-        result = subprocess.run(['npx', 'eslint', '.'], cwd=project_dir, capture_output=True, text=True)
+        result = subprocess.run(['npx', 'eslint', *(paths or ['.'])], cwd=project_dir, capture_output=True, text=True)
         return result.stdout.count('error'), result.stdout
     except Exception as e:
         return -1, f"An error occurred while running linter: {e}"
 
-def log_original_code(file_path, content):
-    log_entry = f"""
-    Original code in {file_path}:
-    ```javascript
-    {content}
-    ```
-    """
-    logging.info(log_entry)
-    console.print("[bold green]Original code logged successfully.[/bold green]")
+def get_metrics_engine(project_dir):
+    from code_metrics import MetricsEngine
 
-def main():
-    # Setup the SQLite database
-    setup_database()
+    project_dir = os.path.abspath(project_dir)
+    engine = _metrics_engines.get(project_dir)
+    if engine is None:
+        engine = _metrics_engines[project_dir] = MetricsEngine()
+    return engine
 
-    # Initialize RL Agent
-    actions = ['proceed', 'modify', 'regenerate']
-    agent = RLAgent(actions)
+@traced('metrics.code_quality')
+def compute_code_quality_metrics(project_dir, file_path, metrics_engine=None):
+    try:
+        metrics = (metrics_engine or get_metrics_engine(project_dir)).compute(project_dir, file_path)
+        console.print(f"[cyan]Max cyclomatic complexity: {metrics['cyclomatic_complexity']}, "
+                      f"duplicated blocks: {metrics['code_duplication']}[/cyan]")
+        return metrics
+    except Exception as e:
+        log_and_print(f"[yellow]Could not compute code quality metrics: {e}[/yellow]", 'info')
+        return None
 
-    console.print(Panel.fit("[bold cyan]Welcome to the AI Assistant![/bold cyan]\n"
-                            "I'm here to help you implement new features in your project.",
-                            title="AI Assistant", border_style="cyan"))
-    
-    project_dir = console.input("[bold cyan]Enter the path to your project folder: [/bold cyan]")
-    
-    while not os.path.exists(project_dir):
-        console.print("[bold red]The specified directory does not exist.[/bold red]")
-        project_dir = console.input("[bold cyan]Please enter a valid project folder path: [/bold cyan]")
-    
-    task_description = console.input("[bold cyan]Describe the feature you want to implement: [/bold cyan]")
-    
-    log_and_print(f"Project directory: {project_dir}")
-    log_and_print(f"Task description: {task_description}")
+def log_original_code(file_path, content):
+    # The content itself goes to the payload store; the record only references its hash
+    logging.info("Original code in %s", file_path, extra={'payload': content, 'file_path': file_path})
+    console.print("[bold green]Original code logged successfully.[/bold green]")
 
-    # Save inputs for future reference
-    save_data({'project_dir': project_dir, 'task_description': task_description}, 'task_info.json')
+def run_task(project_dir, task_description, agent, interactive=True, reward_service=None, metrics_engine=None):
+    """
+    Runs the full pipeline for one task: find the file, generate, validate,
+    save, verify, score and learn.
+
+    Args:
+        project_dir (str): The project folder.
+        task_description (str): The feature to implement.
+        agent (RLAgent): The agent that chooses actions and learns from the reward.
+        interactive (bool): Page through output and ask before regenerating.
+            Non-interactive runs regenerate once automatically when issues are found.
+        reward_service (RewardService, optional): Reused across tasks to keep its cache warm.
+        metrics_engine (MetricsEngine, optional): Defaults to the project's engine in this process.
+
+    Returns:
+        dict: Outcome of the task ('status', 'request_id', 'file', 'reward', ...).
+    """
+    result = {'status': 'failed', 'request_id': None, 'file': None, 'reward': None,
+              'tests_passed': None, 'lint_errors': None, 'issues': []}
 
     # Find relevant file and display content
     relevant_file = find_relevant_files(project_dir, task_description)
     if relevant_file:
         log_and_print(f"[bold green]Relevant file found: {relevant_file}[/bold green]")
-        display_file_content(relevant_file)
+        if interactive:
+            display_file_content(relevant_file)
     else:
         log_and_print("[bold yellow]No relevant file found. A new file will be created.[/bold yellow]")
         relevant_file = os.path.join(project_dir, 'components', 'PasswordInput.js')
+    result['file'] = relevant_file
 
+    request_id = None
     try:
         # Read existing file content or use an empty string for new files
-        file_content = open(relevant_file, 'r', encoding='utf-8').read() if os.path.exists(relevant_file) else ""
+        file_content = read_file_content(relevant_file) if os.path.exists(relevant_file) else ""
 
         # Log the original code
         log_original_code(relevant_file, file_content)
@@ -230,13 +298,21 @@ def main():
         # Insert request into database
         request_id = insert_request(human_request=task_description, task_description=task_description, 
                                     file_path=relevant_file, original_content=file_content)
+        set_request_id(request_id)
+        result['request_id'] = request_id
 
-        # Generate complete code using OpenAI
-        generated_code = generate_complete_code(task_description, file_content)
+        # Reuse a well-scored generation of a near-identical earlier task, or generate with OpenAI
+        generated_code = reuse_prior_generation(task_description, file_content, interactive)
+        result['reused'] = generated_code is not None
+        if generated_code is None:
+            generated_code = generate_complete_code(task_description, file_content)
+        index_task(request_id, task_description, file_content)
 
         if generated_code:
-            console.print(Panel(Syntax(generated_code, "javascript", theme="monokai", line_numbers=True), 
-                                title="Generated Code", expand=False))
+            version = 1
+            insert_code_generation(request_id, version, generated_code)
+            show_code(console, generated_code, "Generated Code", original=file_content or None,
+                      interactive=interactive)
 
             # Validate Next.js specific issues
             nextjs_issues = validate_nextjs_code(generated_code)
@@ -246,21 +322,37 @@ def main():
                     console.print(f"- {issue}")
                 
                 # Ask if the user wants to regenerate the code
-                regenerate = console.input("[bold cyan]Do you want to regenerate the code? (yes/no): [/bold cyan]").lower()
+                if interactive:
+                    regenerate = console.input("[bold cyan]Do you want to regenerate the code? (yes/no): [/bold cyan]").lower()
+                else:
+                    regenerate = 'yes'
                 if regenerate == 'yes':
-                    generated_code = generate_complete_code(task_description, file_content)
-                    console.print(Panel(Syntax(generated_code, "javascript", theme="monokai", line_numbers=True), 
-                                        title="Regenerated Code", expand=False))
+                    regenerated_code = generate_complete_code(task_description, file_content)
+                    if regenerated_code:
+                        generated_code = regenerated_code
+                        version += 1
+                        insert_code_generation(request_id, version, generated_code)
+                        show_code(console, generated_code, "Regenerated Code", original=file_content or None,
+                                  interactive=interactive)
+                        nextjs_issues = validate_nextjs_code(generated_code)
             else:
                 console.print("[bold green]No obvious Next.js issues detected.[/bold green]")
+            result['issues'] = nextjs_issues
 
             # Save generated code to file
             if save_code_to_file(generated_code, relevant_file):
                 console.print("[bold green]Code has been successfully generated and saved.[/bold green]")
                 
-                # Run tests and linter
-                tests_passed, test_output = run_tests(project_dir)
-                lint_errors, lint_output = run_linter(project_dir)
+                # Run tests and linter, unless this exact content (and its imports) was verified before
+                if reward_service is None:
+                    reward_service = RewardService(project_dir, run_tests=run_tests, run_linter=run_linter)
+                quality_metrics = compute_code_quality_metrics(project_dir, relevant_file, metrics_engine)
+                reward, verification = reward_service.score(relevant_file, True,  # Assuming comparison_result is True
+                                                            code_quality_metrics=quality_metrics)
+                tests_passed, test_output = verification['tests_passed'], verification['test_output']
+                lint_errors = verification['lint_errors']
+                if verification['cached']:
+                    console.print("[dim]Reusing cached test and lint results for identical content.[/dim]")
 
                 if tests_passed:
                     console.print("[bold green]Tests passed successfully![/bold green]")
@@ -275,10 +367,14 @@ def main():
 
                 # RL Agent decision-making and reward calculation
                 code_quality_metrics = [int(tests_passed), lint_errors]
-                state = agent.get_state(code_quality_metrics, True)  # Assuming comparison result is True for now
+                state_features = {
+                    'file_size': len(generated_code.encode('utf-8')),
+                    'test_duration': verification.get('test_duration'),
+                    'lint_rules': lint_rule_histogram(verification['lint_output']),
+                }
+                state = agent.get_state(code_quality_metrics, True, **state_features)  # Assuming comparison result is True for now
                 action = agent.choose_action(state)
-                reward = calculate_reward(tests_passed, lint_errors, True)  # Assuming comparison_result is True
-                next_state = agent.get_state(code_quality_metrics, True)  # Update based on actual task progress
+                next_state = agent.get_state(code_quality_metrics, True, **state_features)  # Update based on actual task progress
 
                 # Insert RL data into the database
                 insert_rl_data(request_id, state, action, reward, next_state)
@@ -288,6 +384,8 @@ def main():
                 agent.save_q_table()
 
                 console.print(f"[bold cyan]Reward for this implementation: {reward}[/bold cyan]")
+                result.update(status='completed', reward=reward, action=action,
+                              tests_passed=tests_passed, lint_errors=lint_errors)
 
             else:
                 console.print("[bold red]Failed to save the generated code. Please check file permissions and try again.[/bold red]")
@@ -295,12 +393,53 @@ def main():
             log_and_print("[bold red]Failed to generate code. Exiting.[/bold red]", 'error')
 
     except Exception as e:
+        import traceback
+
         log_and_print(f"[bold red]An unexpected error occurred: {e}[/bold red]", 'error')
         log_and_print(traceback.format_exc(), 'error')
+        result['error'] = str(e)
+    finally:
+        set_request_id(None)
+        flush_spans(request_id)
+
+    return result
+
+def main():
+    from rich.panel import Panel
+
+    setup_logging()
+
+    # Setup the SQLite database
+    setup_database()
+
+    # Initialize RL Agent
+    actions = ['proceed', 'modify', 'regenerate']
+    agent = RLAgent(actions)
+
+    console.print(Panel.fit("[bold cyan]Welcome to the AI Assistant![/bold cyan]\n"
+                            "I'm here to help you implement new features in your project.",
+                            title="AI Assistant", border_style="cyan"))
+    
+    project_dir = console.input("[bold cyan]Enter the path to your project folder: [/bold cyan]")
+    
+    while not os.path.exists(project_dir):
+        console.print("[bold red]The specified directory does not exist.[/bold red]")
+        project_dir = console.input("[bold cyan]Please enter a valid project folder path: [/bold cyan]")
+    
+    task_description = console.input("[bold cyan]Describe the feature you want to implement: [/bold cyan]")
+    
+    log_and_print(f"Project directory: {project_dir}")
+    log_and_print(f"Task description: {task_description}")
+
+    # Save inputs for future reference
+    save_data({'project_dir': project_dir, 'task_description': task_description}, 'task_info.json')
+
+    run_task(project_dir, task_description, agent)
 
     console.print(Panel.fit("[bold cyan]Thank you for using the AI Assistant![/bold cyan]\n"
                             "I hope I was helpful in implementing your feature.",
                             title="Goodbye", border_style="cyan"))
+    console.flush()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,17 +1,16 @@
 import os
+import json
 import subprocess
 import shutil
-from dotenv import load_dotenv
-from openai import OpenAI
-from rich.panel import Panel
-from rich.console import Console
-import subprocess
 
-load_dotenv()  # Load environment variables from .env file
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-console = Console()
+from clients import LazyConsole, get_openai_client
+from tracing import span, record_llm_usage
+
+console = LazyConsole()
 
 def plan_task(description, relevant_file_contents):
+    from rich.panel import Panel
+
     console.print("[bold cyan]Generating implementation plan using OpenAI...[/bold cyan]")
     context = "\n\n".join([f"File: {path}\n{content}" for path, content in relevant_file_contents.items()])
     prompt = f"""
@@ -24,15 +23,17 @@ def plan_task(description, relevant_file_contents):
     Provide the steps as a numbered list, including specific file names and locations where changes should be made.
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0
-        )
+        with span('llm.plan_task', model="gpt-4") as llm_span:
+            response = get_openai_client().chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=1000,
+                temperature=0
+            )
+            record_llm_usage(llm_span, response)
         plan = response.choices[0].message.content.strip()
         console.print(Panel(plan, title="Generated Plan", style="cyan"))
         return plan
@@ -52,6 +53,8 @@ def generate_code(prompt, file_contents):
     Returns:
         str: The generated code.
     """
+    from rich.panel import Panel
+
     console.print("[bold cyan]Generating code using OpenAI...[/bold cyan]")
 
     # Load the OpenAI API key from environment variables
@@ -71,14 +74,16 @@ def generate_code(prompt, file_contents):
     """
 
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=full_prompt,
-            max_tokens=1500,
-            temperature=0,
-            n=1,
-            stop=None,
-        )
+        with span('llm.generate_code', model="text-davinci-003") as llm_span:
+            response = openai.Completion.create(
+                engine="text-davinci-003",
+                prompt=full_prompt,
+                max_tokens=1500,
+                temperature=0,
+                n=1,
+                stop=None,
+            )
+            record_llm_usage(llm_span, response)
         generated_code = response.choices[0].text.strip()
         console.print(Panel(generated_code, title="Generated Code", style="green"))
         return generated_code
@@ -107,7 +112,18 @@ Generated Code:
 Begin now:
 """
     try:
-        refined_code = openai_integration.generate_code(prompt)
+        with span('llm.refine_and_test_code', model="gpt-4") as llm_span:
+            response = get_openai_client().chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000,
+                temperature=0
+            )
+            record_llm_usage(llm_span, response)
+        refined_code = response.choices[0].message.content.strip()
         # Save the refined code to the appropriate file
         target_file = os.path.join(project_dir, 'app', 'login', 'page.js')
         with open(target_file, 'w', encoding='utf-8') as f:
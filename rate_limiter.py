@@ -0,0 +1,345 @@
+# rate_limiter.py
+"""
+Client-side rate limiting and adaptive concurrency for LLM calls.
+
+A shared limiter enforces requests-per-minute and tokens-per-minute token
+buckets and an AIMD concurrency window: the window grows by about one slot
+per window of successful calls and is halved on a 429 (whose Retry-After
+also pauses all callers), a 5xx, a timeout or a dropped connection. Other
+failed calls and slow ones only hold the window: a call is slow while its
+latency per output token is well above the recent median. Waiting callers are admitted strictly by priority, so interactive
+requests jump ahead of batch ones.
+
+RateLimitedClient wraps an OpenAI client so every
+`chat.completions.create` goes through the limiter and 429s, 5xx responses
+and connection errors are retried.
+Limits come from AI_ASSISTANT_RPM / AI_ASSISTANT_TPM / AI_ASSISTANT_MAX_CONCURRENCY.
+"""
+import heapq
+import itertools
+import statistics
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+INTERACTIVE = 0
+BATCH = 10
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 30000
+DEFAULT_MAX_CONCURRENCY = 16
+MAX_RETRIES = 6
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+_local = threading.local()
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Classic token bucket.
+
+    Args:
+        capacity (float): Maximum burst.
+        refill_per_second (float): Tokens added per second.
+    """
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(now)
+        # Requests larger than the bucket may proceed once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount):
+        self.tokens -= amount
+
+    def refund(self, amount):
+        # Negative refunds charge extra when a call used more tokens than estimated
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared RPM/TPM limiter with AIMD concurrency and priority admission.
+
+    Args:
+        requests_per_minute (int): Provider request limit.
+        tokens_per_minute (int): Provider token limit.
+        max_concurrency (int): Upper bound of the concurrency window.
+        min_concurrency (int): Lower bound of the concurrency window.
+        latency_factor (float): Stop growing the window while a call's latency per
+            output token exceeds this multiple of the median of recent calls.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_RPM, tokens_per_minute=DEFAULT_TPM,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, min_concurrency=1, latency_factor=3.0):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max(min_concurrency, min(4, max_concurrency)))
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.paused_until = 0.0
+        # Recent seconds per output token; old samples roll out, so the baseline follows the provider
+        self.recent_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {'admitted': 0, 'rate_limited': 0, 'overloaded': 0, 'failed': 0, 'slow': 0}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, estimated_tokens, priority=INTERACTIVE):
+        """
+        Blocks until the caller may send a request.
+
+        Args:
+            estimated_tokens (int): Tokens the request is expected to use.
+            priority (int): Lower values are admitted first.
+
+        Returns:
+            int: The tokens reserved; pass them back to `release`.
+        """
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait = self._admission_wait(entry, estimated_tokens)
+                    if wait == 0:
+                        break
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.in_flight += 1
+            self.stats['admitted'] += 1
+            # The next waiter may be admissible too
+            self._condition.notify_all()
+        return estimated_tokens
+
+    def _admission_wait(self, entry, estimated_tokens):
+        # Returns 0 if the entry can go now, otherwise how long to wait (None = until notified)
+        if self._waiters[0] != entry:
+            return None
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency_limit):
+            return None
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+
+    def release(self, reserved_tokens, used_tokens=None, latency=None, rate_limited=False, retry_after=None,
+                output_tokens=None, overloaded=False, failed=False):
+        """
+        Returns a slot and feeds the outcome of the call back into the limits.
+
+        Args:
+            reserved_tokens (int): The value returned by `acquire`.
+            used_tokens (int, optional): Actual usage; the difference is refunded or charged.
+            latency (float, optional): Call duration in seconds.
+            rate_limited (bool): The provider answered 429.
+            retry_after (float, optional): Seconds the provider asked us to wait.
+            output_tokens (int, optional): Completion tokens, used to normalize the latency.
+            overloaded (bool): The call failed with a 5xx, a timeout or a dropped connection.
+            failed (bool): The call failed for any other reason.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if used_tokens is not None:
+                self.tokens.refund(reserved_tokens - used_tokens)
+
+            if rate_limited:
+                self.stats['rate_limited'] += 1
+                # Multiplicative decrease
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+                pause = retry_after if retry_after is not None else 1.0
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            elif overloaded:
+                self.stats['overloaded'] += 1
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            elif failed:
+                # Says nothing about capacity either way; hold the window
+                self.stats['failed'] += 1
+            elif latency is not None and output_tokens and self._is_slow(latency / output_tokens):
+                # Hold the window; only 429s shrink it
+                self.stats['slow'] += 1
+            else:
+                # Additive increase: about one slot per window of successful calls
+                self.concurrency_limit = min(self.max_concurrency,
+                                             self.concurrency_limit + 1.0 / self.concurrency_limit)
+            self._condition.notify_all()
+
+    def _is_slow(self, latency_per_token):
+        slow = (len(self.recent_latencies) >= MIN_LATENCY_SAMPLES
+                and latency_per_token > self.latency_factor * statistics.median(self.recent_latencies))
+        self.recent_latencies.append(latency_per_token)
+        return slow
+
+    @contextmanager
+    def slot(self, estimated_tokens, priority=INTERACTIVE):
+        """
+        Context manager around acquire/release. The yielded dict may be
+        updated with 'used_tokens', 'output_tokens', 'rate_limited', 'retry_after',
+        'overloaded' and 'failed'; an exception leaving the block sets them from the error.
+        """
+        reserved = self.acquire(estimated_tokens, priority)
+        outcome = {}
+        start = time.monotonic()
+        try:
+            yield outcome
+        except BaseException as e:
+            if _is_rate_limit(e):
+                outcome['rate_limited'] = True
+                outcome.setdefault('retry_after', _retry_after(e))
+            elif _is_transient(e):
+                outcome['overloaded'] = True
+            else:
+                outcome['failed'] = True
+            raise
+        finally:
+            self.release(reserved, used_tokens=outcome.get('used_tokens'), latency=time.monotonic() - start,
+                         rate_limited=outcome.get('rate_limited', False), retry_after=outcome.get('retry_after'),
+                         output_tokens=outcome.get('output_tokens'), overloaded=outcome.get('overloaded', False),
+                         failed=outcome.get('failed', False))
+
+
+def get_rate_limiter():
+    """Returns the process-wide limiter, configured from the environment on first use."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter(
+                requests_per_minute=int(os.getenv('AI_ASSISTANT_RPM', DEFAULT_RPM)),
+                tokens_per_minute=int(os.getenv('AI_ASSISTANT_TPM', DEFAULT_TPM)),
+                max_concurrency=int(os.getenv('AI_ASSISTANT_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+            )
+        return _shared_limiter
+
+
+@contextmanager
+def request_priority(priority):
+    """Sets the priority of LLM calls made by this thread, e.g. BATCH for background tasks."""
+    previous = getattr(_local, 'priority', INTERACTIVE)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority():
+    return getattr(_local, 'priority', INTERACTIVE)
+
+
+def estimate_tokens(kwargs):
+    """Rough token estimate of a chat request: ~4 characters per prompt token plus max_tokens."""
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in kwargs.get('messages', []))
+    return prompt_chars // 4 + int(kwargs.get('max_tokens') or 0)
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+def _is_rate_limit(error):
+    return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def _is_transient(error):
+    # Server errors and dropped connections, which the SDK would otherwise retry
+    status = getattr(error, 'status_code', None)
+    return (status is not None and status >= 500) or type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner._create(kwargs)
+
+
+class _Chat:
+    def __init__(self, owner):
+        self.completions = _Completions(owner)
+
+
+class RateLimitedClient:
+    """
+    Wraps an OpenAI client so chat completions go through the shared limiter.
+    Other attributes are passed through to the wrapped client.
+
+    Args:
+        client: The OpenAI client.
+        limiter (AdaptiveRateLimiter, optional): Defaults to the process-wide limiter.
+        max_retries (int): Retries after a 429, 5xx or connection error before giving up.
+    """
+
+    def __init__(self, client, limiter=None, max_retries=MAX_RETRIES):
+        self.client = client
+        self.limiter = limiter or get_rate_limiter()
+        self.max_retries = max_retries
+        self.chat = _Chat(self)
+
+    def _create(self, kwargs):
+        estimated = estimate_tokens(kwargs)
+        priority = current_priority()
+        for attempt in range(self.max_retries + 1):
+            backoff = None
+            with self.limiter.slot(estimated, priority) as outcome:
+                try:
+                    response = self.client.chat.completions.create(**kwargs)
+                except Exception as e:
+                    if attempt == self.max_retries or not (_is_rate_limit(e) or _is_transient(e)):
+                        raise
+                    # Without Retry-After, back off exponentially with jitter
+                    backoff = _retry_after(e) or min(60.0, 2 ** attempt * (0.5 + random.random()))
+                    if _is_rate_limit(e):
+                        # The limiter pauses every caller for this long
+                        outcome['rate_limited'] = True
+                        outcome['retry_after'] = backoff
+                        backoff = None
+                    else:
+                        outcome['overloaded'] = True
+                else:
+                    usage = getattr(response, 'usage', None)
+                    if usage is not None and getattr(usage, 'total_tokens', None) is not None:
+                        outcome['used_tokens'] = usage.total_tokens
+                    if usage is not None and getattr(usage, 'completion_tokens', None):
+                        outcome['output_tokens'] = usage.completion_tokens
+                    return response
+            # The slot is released before sleeping so other callers keep going
+            if backoff:
+                time.sleep(backoff)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,250 @@
+# retention.py
+"""
+Retention, archival and compaction for the assistant database.
+
+Policy (days; null keeps forever), read from retention.json or
+AI_ASSISTANT_RETENTION_POLICY when present:
+    content_days       full file contents (Requests.original_content and
+                       CodeGenerations.generated_content) are archived and
+                       cleared; the rows, rewards and RLData stay
+    timings_days       Timings rows are archived and deleted
+    verification_days  VerificationCache entries are deleted (they are only a cache)
+    rl_days            RLData rows are archived and deleted
+
+Archived rows go to gzip JSONL side files under
+<archive_dir>/<Table>/<first rowid>-<last rowid>.jsonl.gz, and are written
+before the database is changed. All work happens in small batches, each
+in its own short WAL transaction with a pause in between. Concurrent
+insert_request/insert_rl_data calls therefore never wait for more than one
+batch. Freed pages go back to the filesystem through incremental vacuum,
+also a few pages at a time. Contents smaller than a page only leave
+partly empty pages behind; enable_incremental_vacuum's one-off VACUUM
+reclaims those as well.
+"""
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import database
+
+POLICY_FILE = 'retention.json'
+ARCHIVE_DIR = 'archive'
+DEFAULT_POLICY = {
+    'content_days': 30,
+    'timings_days': 30,
+    'verification_days': 30,
+    'rl_days': None,
+}
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE = 0.05
+VACUUM_PAGES_PER_STEP = 256
+
+# (table, policy key, columns cleared or None to delete the row, archive the rows first)
+RULES = [
+    ('Requests', 'content_days', ['original_content'], True),
+    ('CodeGenerations', 'content_days', ['generated_content'], True),
+    ('Timings', 'timings_days', None, True),
+    ('VerificationCache', 'verification_days', None, False),
+    ('RLData', 'rl_days', None, True),
+]
+
+
+def load_policy(path=None):
+    """Returns DEFAULT_POLICY overridden by the JSON policy file, if there is one."""
+    policy = dict(DEFAULT_POLICY)
+    path = path or os.getenv('AI_ASSISTANT_RETENTION_POLICY', POLICY_FILE)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError(f"Unknown retention settings in {path}: {', '.join(sorted(unknown))}")
+        policy.update(overrides)
+    return policy
+
+
+def _connect():
+    # Autocommit, so every batch controls its own (short) transaction
+    conn = sqlite3.connect(database.DATABASE_FILE, timeout=30, isolation_level=None)
+    conn.execute(database.AUTO_VACUUM_PRAGMA)
+    conn.execute("PRAGMA journal_mode = WAL")  # Readers and other writers keep going between batches
+    return conn
+
+
+def _cutoff(days):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - days * 86400))
+
+
+def _write_archive(archive_dir, table, columns, rows):
+    directory = os.path.join(archive_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{rows[0][0]:012d}-{rows[-1][0]:012d}.jsonl.gz")
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), default=repr) + '\n')
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    # The archive is durable before the rows leave the database
+    os.replace(tmp_path, path)
+    return path
+
+
+def _apply_rule(conn, table, cleared_columns, archive, cutoff, archive_dir, batch_size, pause, dry_run, stop_event):
+    if cleared_columns:
+        pending = ' OR '.join(f"{column} IS NOT NULL" for column in cleared_columns)
+        select = ', '.join(['rowid', 'id', 'timestamp'] + cleared_columns)
+        condition = f"timestamp < ? AND ({pending})"
+    else:
+        select = 'rowid, *'
+        condition = 'timestamp < ?'
+
+    if dry_run:
+        return conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {condition}', (cutoff,)).fetchone()[0]
+
+    processed, last_rowid = 0, 0
+    while True:
+        cursor = conn.execute(f'SELECT {select} FROM {table} WHERE rowid > ? AND {condition} ORDER BY rowid LIMIT ?',
+                              (last_rowid, cutoff, batch_size))
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        if archive:
+            _write_archive(archive_dir, table, columns, rows)
+
+        rowids = [row[0] for row in rows]
+        placeholders = ','.join('?' * len(rowids))
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if cleared_columns:
+                assignments = ', '.join(f"{column} = NULL" for column in cleared_columns)
+                conn.execute(f'UPDATE {table} SET {assignments} WHERE rowid IN ({placeholders})', rowids)
+                if table == 'Requests':
+                    # Without its content a request can't be matched for reuse anymore (see similarity_index)
+                    conn.execute(f'DELETE FROM TaskBuckets WHERE request_id IN ({placeholders})', rowids)
+                    conn.execute(f'DELETE FROM TaskSignatures WHERE request_id IN ({placeholders})', rowids)
+            else:
+                conn.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', rowids)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        processed += len(rows)
+        last_rowid = rowids[-1]
+        if len(rows) < batch_size or stop_event.wait(pause):
+            break
+    return processed
+
+
+def incremental_vacuum(conn, pages_per_step=VACUUM_PAGES_PER_STEP, pause=DEFAULT_PAUSE, stop_event=None):
+    """
+    Returns free pages to the filesystem a few at a time.
+
+    Returns:
+        int | None: Pages released, or None if the database isn't in incremental auto-vacuum mode.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return None
+    stop_event = stop_event or threading.Event()
+    released = 0
+    while True:
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if free_pages == 0:
+            break
+        pages = min(free_pages, pages_per_step)
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f'PRAGMA incremental_vacuum({pages});')
+        released += pages
+        if stop_event.wait(pause):
+            break
+    conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+    return released
+
+
+def enable_incremental_vacuum():
+    """
+    Switches an existing database to incremental auto-vacuum.
+
+    This runs a full VACUUM, which blocks other writers while it rebuilds the file, so do it once
+    during a quiet period. Databases created by setup_database already use incremental mode.
+    """
+    conn = _connect()
+    try:
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+
+def apply_retention(policy=None, archive_dir=ARCHIVE_DIR, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE,
+                    dry_run=False, stop_event=None):
+    """
+    Applies a retention policy.
+
+    Args:
+        policy (dict, optional): Overrides of DEFAULT_POLICY; defaults to load_policy().
+        archive_dir (str): Where archived rows are written.
+        batch_size (int): Rows per transaction.
+        pause (float): Seconds between batches, leaving room for other writers.
+        dry_run (bool): Only count the rows that would be archived, cleared or deleted.
+        stop_event (threading.Event, optional): Stops the run after the current batch when set.
+
+    Returns:
+        dict: Rows processed per table, plus 'vacuumed_pages' (None if not in incremental mode).
+    """
+    policy = dict(DEFAULT_POLICY, **(policy if policy is not None else load_policy()))
+    stop_event = stop_event or threading.Event()
+    conn = _connect()
+    stats = {}
+    try:
+        for table, key, cleared_columns, archive in RULES:
+            days = policy.get(key)
+            if days is None:
+                continue
+            stats[table] = _apply_rule(conn, table, cleared_columns, archive, _cutoff(days), archive_dir,
+                                       batch_size, pause, dry_run, stop_event)
+            if stop_event.is_set():
+                break
+        stats['vacuumed_pages'] = None if dry_run else incremental_vacuum(conn, pause=pause, stop_event=stop_event)
+    finally:
+        conn.close()
+    return stats
+
+
+class RetentionJob:
+    """
+    Applies the retention policy periodically on a background thread.
+
+    Args:
+        interval (float): Seconds between runs.
+        **options: Passed to apply_retention.
+    """
+
+    def __init__(self, interval, **options):
+        self.interval = interval
+        self.options = options
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        import logging
+
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_result = apply_retention(stop_event=self._stop, **self.options)
+                logging.info("Retention run finished: %s", self.last_result)
+            except Exception:
+                logging.exception("Retention run failed")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
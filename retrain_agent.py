@@ -2,7 +2,7 @@
 from rl_agent import RLAgent
 
 def retrain_agent():
-    agent = RLAgent(actions=['action1', 'action2'])
+    agent = RLAgent(actions=['proceed', 'modify', 'regenerate'])
     agent.load_q_table()
     agent.retrain()
     agent.save_q_table()
@@ -0,0 +1,183 @@
+# reward_service.py
+"""
+Reward computation backed by cached verification results.
+
+Lint and test outcomes are cached per file, keyed by the SHA-256 of the file
+plus its local import closure, the project's test files (npm test runs the
+whole suite) with their closures, and the tooling config. A candidate whose
+content was already verified is re-scored without running npm/eslint.
+"""
+import hashlib
+import os
+import re
+import time
+
+from database import get_verification_result, insert_verification_result
+from reward_calculation import calculate_reward
+from tracing import span
+
+JS_EXTENSIONS = ('.js', '.jsx')
+# Files outside the import closure that still change lint/test outcomes
+PROJECT_CONFIG_FILES = ('package.json', '.eslintrc', '.eslintrc.js', '.eslintrc.json', 'eslint.config.js',
+                        'jest.config.js', 'jest.setup.js', 'next.config.js', 'babel.config.js')
+TEST_DIR_NAMES = ('__tests__', 'test', 'tests')
+TEST_FILE_PATTERN = re.compile(r'\.(?:test|spec)\.[jt]sx?$')
+SKIPPED_DIRS = ('node_modules', '.git', '.next', '.ai-worktrees', 'coverage', 'build', 'out')
+
+IMPORT_PATTERN = re.compile(r'''(?:import\s[^'"]*?from\s*|import\s*\(?\s*|require\s*\(\s*)['"](\.{1,2}/[^'"]+)['"]''')
+
+
+def resolve_import(importer, specifier):
+    """Resolves a relative JS import to a file path, or None if it can't be found."""
+    base = os.path.normpath(os.path.join(os.path.dirname(importer), specifier))
+    candidates = [base] + [base + ext for ext in JS_EXTENSIONS] + \
+                 [os.path.join(base, 'index' + ext) for ext in JS_EXTENSIONS]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def dependency_closure(file_path):
+    """
+    Collects a file and every local module it (transitively) imports.
+
+    Args:
+        file_path (str): The entry file.
+
+    Returns:
+        list: Sorted absolute paths in the closure.
+    """
+    file_path = os.path.abspath(file_path)
+    seen = {file_path}
+    pending = [file_path]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(current, 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError:
+            continue
+        for specifier in IMPORT_PATTERN.findall(source):
+            resolved = resolve_import(current, specifier)
+            if resolved and resolved not in seen:
+                seen.add(resolved)
+                pending.append(resolved)
+    return sorted(seen)
+
+
+def test_files(project_dir):
+    """Lists the project's test files: *.test/*.spec files and anything under a test directory."""
+    found = []
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+        in_test_dir = any(part in TEST_DIR_NAMES for part in os.path.relpath(root, project_dir).split(os.sep))
+        for name in files:
+            if TEST_FILE_PATTERN.search(name) or (in_test_dir and name.endswith(('.js', '.jsx', '.ts', '.tsx'))):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def content_hash(file_path, project_dir):
+    """
+    Hashes a file together with its dependency closure, the project's test files and their closures,
+    and the project's tooling config.
+
+    Returns:
+        str: SHA-256 hex digest identifying the verification inputs.
+    """
+    digest = hashlib.sha256()
+    project_dir = os.path.abspath(project_dir)
+    closure = set()
+    for entry in [file_path] + test_files(project_dir):
+        if entry not in closure:
+            closure.update(dependency_closure(entry))
+    paths = sorted(closure)
+    paths += [os.path.join(project_dir, name) for name in PROJECT_CONFIG_FILES]
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        digest.update(os.path.relpath(path, project_dir).encode('utf-8'))
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+class RewardService:
+    """
+    Scores candidates from cached lint/test outcomes.
+
+    Args:
+        project_dir (str): The project root.
+        run_tests (callable): `run_tests(project_dir) -> (passed, output)`; passed is None if the tests
+            couldn't be run. A third element, if returned, is the tests' own duration in seconds
+            (e.g. excluding time spent queued); otherwise the call is timed here.
+        run_linter (callable): `run_linter(project_dir, paths=None) -> (error_count, output)`.
+    """
+
+    def __init__(self, project_dir, run_tests=None, run_linter=None):
+        if run_tests is None or run_linter is None:
+            import task_execution
+            run_tests = run_tests or task_execution.run_tests
+            run_linter = run_linter or task_execution.run_linter
+        self.project_dir = project_dir
+        self.run_tests = run_tests
+        self.run_linter = run_linter
+        self._results = {}
+
+    def verify(self, file_path):
+        """
+        Returns the lint and test outcome for the current content of a file,
+        running the tools only if this content hasn't been verified before.
+
+        Returns:
+            dict: {'content_hash', 'tests_passed', 'test_output', 'lint_errors', 'lint_output',
+                'test_duration' (seconds, None for entries cached before it was recorded), 'cached'}
+        """
+        with span('reward.content_hash'):
+            key = content_hash(file_path, self.project_dir)
+
+        result = self._results.get(key) or get_verification_result(key)
+        if result is not None:
+            result = dict(result, cached=True)
+            self._results[key] = result
+            return result
+
+        started = time.perf_counter()
+        tests_passed, test_output, *measured = self.run_tests(self.project_dir)
+        test_duration = measured[0] if measured else time.perf_counter() - started
+        relative_path = os.path.relpath(file_path, self.project_dir)
+        lint_errors, lint_output = self.run_linter(self.project_dir, paths=[relative_path])
+
+        result = {
+            'content_hash': key,
+            'tests_passed': bool(tests_passed),
+            'test_output': test_output,
+            'lint_errors': lint_errors,
+            'lint_output': lint_output,
+            'test_duration': test_duration,
+        }
+        # Tools that failed to run (tests None, lint -1) say nothing about the content; don't remember that
+        if tests_passed is not None and lint_errors >= 0:
+            insert_verification_result(key, result['tests_passed'], lint_errors, test_output, lint_output,
+                                       test_duration)
+            self._results[key] = dict(result, cached=True)
+        return dict(result, cached=False)
+
+    def score(self, file_path, comparison_result=True, code_quality_metrics=None):
+        """
+        Verifies (or looks up) a candidate and computes its reward.
+
+        Args:
+            file_path (str): The candidate file on disk.
+            comparison_result (bool): Whether the code comparison succeeded.
+            code_quality_metrics (dict, optional): Passed through to calculate_reward.
+
+        Returns:
+            tuple: (reward, verification result dict)
+        """
+        result = self.verify(file_path)
+        reward = calculate_reward(result['tests_passed'], max(result['lint_errors'], 0), comparison_result,
+                                  code_quality_metrics)
+        return reward, result
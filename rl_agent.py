@@ -1,50 +1,122 @@
+import os
 import random
-import pickle
+from array import array
 from database import insert_rl_data, get_connection
+from state_encoders import build_features, get_encoder, normalize_state
+from tracing import traced
 
 class RLAgent:
-    def __init__(self, actions, alpha=0.1, gamma=0.9):
-        self.q_table = {}
+    def __init__(self, actions, alpha=0.1, gamma=0.9, encoder=None, shared_path=None):
+        # Q-values are a fixed-size table of encoder rows x actions; see state_encoders
+        self.encoder = encoder or get_encoder()
+        # With a shared table, every process using the same file learns into the same rows
+        shared_path = shared_path or os.getenv('AI_ASSISTANT_SHARED_Q_TABLE')
+        if shared_path:
+            from shared_q_table import open_shared_table
+            self.shared_table = open_shared_table(shared_path, self.encoder, len(actions))
+            self.q_table = self.shared_table.values
+        else:
+            self.shared_table = None
+            self.q_table = array('d', bytes(8 * self.encoder.size * len(actions)))
         self.actions = actions
         self.alpha = alpha
         self.gamma = gamma
         self.experiences = []
 
-    def get_state(self, code_quality_metrics, comparison_result):
-        return tuple(code_quality_metrics + [int(comparison_result)])
+    def get_state(self, code_quality_metrics, comparison_result, **features):
+        tests_passed, lint_errors = code_quality_metrics[:2]
+        return build_features(tests_passed, lint_errors, comparison_result, **features)
+
+    def q_values(self, state):
+        width = len(self.actions)
+        rows = self.encoder.encode(state)
+        return [sum(self.q_table[row * width + a] for row in rows) for a in range(width)]
 
     def choose_action(self, state, epsilon=0.1):
         if random.uniform(0, 1) < epsilon:
             return random.choice(self.actions)
-        self.q_table.setdefault(state, {a: 0.0 for a in self.actions})
-        max_q = max(self.q_table[state].values())
-        return random.choice([a for a, q in self.q_table[state].items() if q == max_q])
+        values = self.q_values(state)
+        max_q = max(values)
+        return random.choice([a for a, q in zip(self.actions, values) if q == max_q])
 
     def learn(self, state, action, reward, next_state):
-        self.q_table.setdefault(state, {a: 0.0 for a in self.actions})
-        self.q_table.setdefault(next_state, {a: 0.0 for a in self.actions})
-        predict = self.q_table[state][action]
-        target = reward + self.gamma * max(self.q_table[next_state].values())
-        self.q_table[state][action] += self.alpha * (target - predict)
+        width = len(self.actions)
+        rows = self.encoder.encode(state)
+        a = self.actions.index(action)
+        predict = self.q_values(state)[a]
+        target = reward + self.gamma * max(self.q_values(next_state))
+        # Spread the update over the active rows so the step size doesn't depend on how many there are
+        step = self.alpha * (target - predict) / len(rows)
+        if self.shared_table is not None:
+            self.shared_table.add(rows, a, step)
+        else:
+            for row in rows:
+                self.q_table[row * width + a] += step
         self.experiences.append((state, action, reward, next_state))
+        return target - predict
 
+    @traced('rl.save_q_table')
     def save_q_table(self, filename='q_table.pkl'):
+        if self.shared_table is not None:
+            # The mapped file is already shared; only write the pickle once per checkpoint interval
+            self.shared_table.maybe_checkpoint(filename, self.encoder.spec, self.actions)
+            return
+        import pickle
+
         with open(filename, 'wb') as f:
-            pickle.dump(self.q_table, f)
+            pickle.dump({'encoder': self.encoder.spec, 'actions': self.actions, 'q_table': self.q_table}, f)
 
     def load_q_table(self, filename='q_table.pkl'):
+        if self.shared_table is not None:
+            if not self.shared_table.created:
+                # Other processes have been learning into the shared table; it is newer than any checkpoint
+                return
+            self.shared_table.created = False  # Seed it only once
+        import pickle
+
         try:
             with open(filename, 'rb') as f:
-                self.q_table = pickle.load(f)
+                saved = pickle.load(f)
         except FileNotFoundError:
-            pass
+            return
+        if isinstance(saved, dict) and 'encoder' in saved:
+            if saved['encoder'] == self.encoder.spec and saved['actions'] == self.actions:
+                if self.shared_table is not None:
+                    self.shared_table.load(saved['q_table'])
+                else:
+                    self.q_table = saved['q_table']
+            else:
+                import logging
+                logging.warning("Ignoring %s: it was saved with a different state encoder or actions; "
+                                "run retrain to rebuild it from RLData", filename)
+        else:
+            self._migrate_raw_table(saved)
+
+    def _migrate_raw_table(self, raw_table):
+        # Older files map raw state tuples to {action: q}; average them into the encoder's rows
+        width = len(self.actions)
+        totals, counts = {}, {}
+        for state, values in raw_table.items():
+            try:
+                rows = self.encoder.encode(state)
+            except (TypeError, ValueError):
+                continue
+            for action, value in values.items():
+                if action not in self.actions:
+                    continue
+                for row in rows:
+                    cell = row * width + self.actions.index(action)
+                    totals[cell] = totals.get(cell, 0.0) + value / len(rows)
+                    counts[cell] = counts.get(cell, 0) + 1
+        for cell, total in totals.items():
+            self.q_table[cell] = total / counts[cell]
 
     def learn_from_experiences(self, experiences):
         for state, action, reward, next_state in experiences:
-            # Convert state and next_state back to tuples if they're lists
-            state = tuple(state) if isinstance(state, list) else state
-            next_state = tuple(next_state) if isinstance(next_state, list) else next_state
-            self.learn(state, action, reward, next_state)
+            # States come back from RLData as JSON (feature dicts, or lists in older rows)
+            if action not in self.actions or reward is None:
+                continue
+            self.learn(normalize_state(state), action, reward, normalize_state(next_state))
             
             
     def load_experiences_from_db(self):
@@ -0,0 +1,200 @@
+# shared_q_table.py
+"""
+A Q-table in a memory-mapped file that several assistant processes learn into at once.
+
+Every process maps the same file, so reads (choose_action) are plain memory
+reads. Updates add to a cell under a stripe lock: a per-process thread lock
+plus an fcntl byte-range lock on `<path>.lock`, with the stripe picked by
+row. Concurrent learners only wait for each other when they touch rows in
+the same stripe, and no update is lost. Without fcntl (Windows) the stripes
+are only thread locks, which is safe for one process.
+
+The mapping is written back by the OS. checkpoint()/maybe_checkpoint() also
+write a regular pickled Q-table (the format RLAgent.save_q_table uses), at
+most once per interval across all processes.
+
+Enable it with AI_ASSISTANT_SHARED_Q_TABLE=<path>.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: stripes fall back to thread locks
+    fcntl = None
+
+MAGIC = b'AIQT'
+VERSION = 1
+# magic, version, rows, width, encoder spec checksum, last checkpoint time; padded so the data stays aligned
+HEADER = struct.Struct('<4sIIIId')
+HEADER_SIZE = 64
+CHECKPOINT_FIELD = HEADER.size - 8
+DEFAULT_STRIPES = 64
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+_open_tables = {}
+_open_tables_lock = threading.Lock()
+
+
+def _spec_checksum(spec):
+    return zlib.crc32(json.dumps(spec, sort_keys=True).encode('utf-8'))
+
+
+class SharedQTable:
+    """
+    Maps (creating if needed) a shared Q-table file sized for an encoder and a number of actions.
+
+    Args:
+        path (str): The table file; `<path>.lock` holds the byte-range locks.
+        encoder: The state encoder (its size and spec must match the file).
+        width (int): Number of actions.
+        stripes (int): Number of row locks.
+        checkpoint_interval (float): Minimum seconds between checkpoints across all processes.
+
+    Attributes:
+        values (memoryview): The rows x actions doubles, indexable like RLAgent.q_table.
+        created (bool): True if this process created the file, so it may seed it.
+    """
+
+    def __init__(self, path, encoder, width, stripes=DEFAULT_STRIPES,
+                 checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.rows = encoder.size
+        self.width = width
+        self.stripes = stripes
+        self.checkpoint_interval = checkpoint_interval
+        self._checksum = _spec_checksum(encoder.spec)
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self._checkpoint_lock = threading.Lock()
+        self._lock_fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+
+        size = HEADER_SIZE + 8 * self.rows * width
+        # The last lock byte serializes creation and checkpoints
+        with self._file_lock(stripes):
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                self.created = os.fstat(fd).st_size == 0
+                if self.created:
+                    os.ftruncate(fd, size)
+                    # lseek + write/read rather than pwrite/pread, which Windows doesn't have
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, HEADER.pack(MAGIC, VERSION, self.rows, width, self._checksum, 0.0))
+                os.lseek(fd, 0, os.SEEK_SET)
+                header = os.read(fd, HEADER.size)
+                compatible = (os.fstat(fd).st_size == size and len(header) == HEADER.size
+                              and HEADER.unpack(header)[:5] == (MAGIC, VERSION, self.rows, width, self._checksum))
+                if compatible:
+                    self._mmap = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+        if not compatible:
+            os.close(self._lock_fd)
+            raise ValueError(f"{path} was created for a different state encoder or action set; "
+                             f"remove it or point AI_ASSISTANT_SHARED_Q_TABLE elsewhere")
+        self.values = memoryview(self._mmap)[HEADER_SIZE:].cast('d')
+
+    @contextmanager
+    def _file_lock(self, offset, blocking=True):
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB), 1, offset)
+        except (BlockingIOError, PermissionError):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, offset)
+
+    @contextmanager
+    def _locked(self, stripes):
+        # Always in ascending order so two learners can't deadlock
+        acquired = []
+        try:
+            for stripe in stripes:
+                self._thread_locks[stripe].acquire()
+                acquired.append(stripe)
+                if fcntl is not None:
+                    fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                if fcntl is not None:
+                    fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, stripe)
+                self._thread_locks[stripe].release()
+
+    def add(self, rows, action_index, delta):
+        """Adds delta to the action's cell in each of the given rows."""
+        with self._locked(sorted({row % self.stripes for row in rows})):
+            for row in rows:
+                self.values[row * self.width + action_index] += delta
+
+    def snapshot(self):
+        """Returns a consistent copy of the table as array('d')."""
+        with self._locked(range(self.stripes)):
+            copy = array('d')
+            copy.frombytes(self.values.tobytes())
+        return copy
+
+    def load(self, values):
+        """Overwrites the whole table, e.g. to seed a freshly created file from q_table.pkl."""
+        with self._locked(range(self.stripes)):
+            self.values[:] = array('d', values)
+
+    def checkpoint(self, filename, spec, actions):
+        """Flushes the mapping and writes a pickled Q-table snapshot atomically."""
+        self._mmap.flush()
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            pickle.dump({'encoder': spec, 'actions': actions, 'q_table': self.snapshot()}, f)
+        os.replace(tmp_filename, filename)
+        struct.pack_into('<d', self._mmap, CHECKPOINT_FIELD, time.time())
+
+    def maybe_checkpoint(self, filename, spec, actions):
+        """Checkpoints unless another process did within checkpoint_interval. Returns True if it did."""
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._file_lock(self.stripes, blocking=False) as locked:
+                last = struct.unpack_from('<d', self._mmap, CHECKPOINT_FIELD)[0]
+                if not locked or time.time() - last < self.checkpoint_interval:
+                    return False
+                self.checkpoint(filename, spec, actions)
+                return True
+        finally:
+            self._checkpoint_lock.release()
+
+    def close(self):
+        with _open_tables_lock:
+            _open_tables.pop(os.path.abspath(self.path), None)
+        self.values.release()
+        self._mmap.flush()
+        self._mmap.close()
+        os.close(self._lock_fd)
+
+
+def open_shared_table(path, encoder, width):
+    """
+    Returns this process's SharedQTable for a path, mapping it on first use.
+
+    Closing any descriptor of the lock file drops all of the process's fcntl locks on it,
+    so every agent in a process shares one instance per file.
+    """
+    key = os.path.abspath(path)
+    with _open_tables_lock:
+        table = _open_tables.get(key)
+        if table is None:
+            table = _open_tables[key] = SharedQTable(path, encoder, width)
+        elif (table.rows, table.width, table._checksum) != (encoder.size, width, _spec_checksum(encoder.spec)):
+            raise ValueError(f"{path} is already open for a different state encoder or action set")
+        return table
@@ -0,0 +1,182 @@
+# similarity_index.py
+"""
+Near-duplicate task detection with MinHash signatures and LSH banding.
+
+Each request is indexed by a MinHash signature of its task description,
+bucketed per band together with the hash of the file content it was made
+against. Before generating, the pipeline looks up earlier requests on the
+same content with a similar description whose generation scored well in
+RLData, and can reuse that generation instead of calling the model.
+
+Signatures and buckets live in the assistant database (TaskSignatures and
+TaskBuckets tables).
+"""
+import hashlib
+import random
+import re
+import struct
+import zlib
+from array import array
+
+from database import get_connection
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+SIMILARITY_THRESHOLD = 0.6
+MIN_REWARD = 20
+
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def content_hash(content):
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def shingles(text):
+    """Word unigrams and bigrams of the normalized text ("show/hide" -> "show", "hide", "show hide")."""
+    words = _WORD.findall((text or '').lower())
+    result = set(words)
+    result.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return result
+
+
+def minhash(text):
+    """
+    Computes the MinHash signature of a text.
+
+    Returns:
+        array: NUM_PERMUTATIONS unsigned 32-bit minimums.
+    """
+    values = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)]
+    signature = array('I', [MAX_HASH] * NUM_PERMUTATIONS)
+    if not values:
+        return signature
+    for index, (a, b) in enumerate(_PERMUTATIONS):
+        signature[index] = min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in values)
+    return signature
+
+
+def estimate_similarity(signature, other):
+    """Estimated Jaccard similarity: the fraction of equal signature positions."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERMUTATIONS
+
+
+def band_keys(signature, file_hash):
+    """LSH bucket keys; two requests share a bucket if one band matches on the same content."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'{ROWS_PER_BAND}I', *rows), digest_size=8).hexdigest()
+        keys.append(f"{file_hash[:16]}:{band}:{digest}")
+    return keys
+
+
+def index_request(request_id, task_description, file_content):
+    """Adds a request to the similarity index."""
+    signature = minhash(task_description)
+    file_hash = content_hash(file_content)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute('INSERT OR REPLACE INTO TaskSignatures (request_id, content_hash, signature) VALUES (?, ?, ?)',
+                (request_id, file_hash, signature.tobytes()))
+    cur.executemany('INSERT INTO TaskBuckets (bucket, request_id) VALUES (?, ?)',
+                    [(key, request_id) for key in band_keys(signature, file_hash)])
+    conn.commit()
+    conn.close()
+
+
+def find_similar_requests(task_description, file_content, threshold=SIMILARITY_THRESHOLD, exclude_request_id=None):
+    """
+    Finds indexed requests on the same file content with a similar description.
+
+    Returns:
+        list: (similarity, request_id) pairs, most similar first.
+    """
+    signature = minhash(task_description)
+    file_hash = content_hash(file_content)
+    keys = band_keys(signature, file_hash)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    placeholders = ','.join('?' * len(keys))
+    cur.execute(f'''
+        SELECT s.request_id, s.signature
+        FROM TaskSignatures s
+        WHERE s.content_hash = ?
+          AND s.request_id IN (SELECT DISTINCT request_id FROM TaskBuckets WHERE bucket IN ({placeholders}))
+    ''', (file_hash, *keys))
+    candidates = cur.fetchall()
+    conn.close()
+
+    matches = []
+    for request_id, blob in candidates:
+        if request_id == exclude_request_id:
+            continue
+        similarity = estimate_similarity(signature, array('I', blob))
+        if similarity >= threshold:
+            matches.append((similarity, request_id))
+    matches.sort(reverse=True)
+    return matches
+
+
+def find_reusable_generation(task_description, file_content, threshold=SIMILARITY_THRESHOLD, min_reward=MIN_REWARD,
+                             exclude_request_id=None):
+    """
+    Returns the best earlier generation for a near-identical task, if one scored well.
+
+    Returns:
+        dict | None: {'request_id', 'similarity', 'reward', 'version', 'generated_content', 'task_description'}
+    """
+    matches = find_similar_requests(task_description, file_content, threshold, exclude_request_id)
+    if not matches:
+        return None
+    similarities = {request_id: similarity for similarity, request_id in matches}
+
+    conn = get_connection()
+    cur = conn.cursor()
+    placeholders = ','.join('?' * len(similarities))
+    # Latest generation of each candidate request together with its best reward
+    cur.execute(f'''
+        SELECT c.request_id, c.version, c.generated_content, MAX(rl.reward), r.task_description
+        FROM CodeGenerations c
+        JOIN RLData rl ON rl.request_id = c.request_id
+        JOIN Requests r ON r.id = c.request_id
+        WHERE c.request_id IN ({placeholders})
+          AND c.generated_content IS NOT NULL
+          AND c.version = (SELECT MAX(version) FROM CodeGenerations WHERE request_id = c.request_id)
+        GROUP BY c.request_id
+        HAVING MAX(rl.reward) >= ?
+    ''', (*similarities, min_reward))
+    rows = cur.fetchall()
+    conn.close()
+
+    best = None
+    for request_id, version, generated_content, reward, description in rows:
+        candidate = {'request_id': request_id, 'similarity': similarities[request_id], 'reward': reward,
+                     'version': version, 'generated_content': generated_content, 'task_description': description}
+        if best is None or (candidate['reward'], candidate['similarity']) > (best['reward'], best['similarity']):
+            best = candidate
+    return best
+
+
+def rebuild_index():
+    """Re-indexes every stored request (e.g. after importing an older database)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute('DELETE FROM TaskBuckets')
+    cur.execute('DELETE FROM TaskSignatures')
+    conn.commit()
+    # Requests whose content was cleared by retention can't be reused, so they aren't indexed
+    cur.execute('SELECT id, task_description, original_content FROM Requests WHERE original_content IS NOT NULL')
+    rows = cur.fetchall()
+    conn.close()
+    for request_id, task_description, original_content in rows:
+        index_request(request_id, task_description, original_content)
+    return len(rows)
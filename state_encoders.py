@@ -0,0 +1,208 @@
+# state_encoders.py
+"""
+Maps the agent's state features onto a fixed number of Q-table rows.
+
+A state is a dict of features (see build_features). RLData rows written
+before features existed hold [tests_passed, lint_errors, comparison] lists;
+normalize_state accepts both. Every encoder returns the tuple of rows that
+are active for a state. The agent's Q-value is the sum of those rows'
+weights, so the table keeps its size no matter how many distinct lint
+counts, file sizes or rule names turn up.
+
+    bucket   one row per combination of feature bins (plain tabular Q-learning)
+    tiles    several offset bucketings; nearby states share rows and generalize
+    hashing  feature=value tokens, lint rule names included, hashed into a fixed table
+
+Select one with AI_ASSISTANT_STATE_ENCODER (default: bucket).
+"""
+import bisect
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+
+LEGACY_FEATURES = ('tests_passed', 'lint_errors', 'comparison')
+
+# Upper-exclusive bin edges per numeric feature; a missing value gets a bin of its own
+DEFAULT_BINS = {
+    'tests_passed': (1,),
+    'comparison': (1,),
+    'lint_errors': (1, 2, 4, 8, 16, 32),
+    'file_size': (1000, 4000, 16000, 64000),
+    'test_duration': (1.0, 5.0, 20.0, 60.0),
+}
+
+# eslint's default formatter: "  12:5  error  'x' is defined but never used  no-unused-vars"
+LINT_RULE_PATTERN = re.compile(r'^\s*\d+:\d+\s+(?:error|warning)\s+.*?\s{2,}(@?[\w/-]+)\s*$', re.MULTILINE)
+
+
+def lint_rule_histogram(lint_output):
+    """Counts eslint findings per rule id."""
+    return dict(Counter(LINT_RULE_PATTERN.findall(lint_output or '')))
+
+
+def build_features(tests_passed, lint_errors, comparison_result=True, file_size=None, test_duration=None,
+                   lint_rules=None):
+    """
+    Builds the state features recorded in RLData and fed to the encoders.
+
+    Returns:
+        dict: JSON-serializable features; unknown values are None.
+    """
+    return {
+        'tests_passed': int(bool(tests_passed)),
+        'lint_errors': lint_errors,
+        'comparison': int(bool(comparison_result)),
+        'file_size': file_size,
+        'test_duration': round(test_duration, 3) if test_duration is not None else None,
+        'lint_rules': dict(lint_rules or {}),
+    }
+
+
+def normalize_state(state):
+    """Accepts a feature dict, a legacy list/tuple or either one serialized as JSON."""
+    if isinstance(state, (str, bytes)):
+        state = json.loads(state)
+    if isinstance(state, dict):
+        return state
+    if isinstance(state, (list, tuple)):
+        return dict(zip(LEGACY_FEATURES, state))
+    raise TypeError(f"Unsupported state: {state!r}")
+
+
+def _bin(edges, value):
+    if not isinstance(value, (int, float)) or value < 0:
+        return len(edges) + 1
+    return bisect.bisect_right(edges, value)
+
+
+def _position(edges, value):
+    # Continuous bin coordinate: bin index plus the fraction covered within the bin
+    if not isinstance(value, (int, float)) or value < 0:
+        return None
+    index = bisect.bisect_right(edges, value)
+    if index == 0:
+        return value / edges[0] if edges[0] else 0.0
+    if index == len(edges):
+        return float(index)
+    low, high = edges[index - 1], edges[index]
+    return index + (value - low) / (high - low)
+
+
+class BucketEncoder:
+    """
+    One active row per combination of feature bins.
+
+    Args:
+        bins (dict, optional): Feature name -> ascending bin edges. Defaults to DEFAULT_BINS.
+    """
+
+    name = 'bucket'
+
+    def __init__(self, bins=None):
+        self.bins = dict(bins or DEFAULT_BINS)
+        self.features = sorted(self.bins)
+        # Bins per feature: len(edges) + 1 ranges plus one for missing values
+        self._radices = [len(self.bins[name]) + 2 for name in self.features]
+        self.size = math.prod(self._radices)
+
+    @property
+    def spec(self):
+        return {'name': self.name, 'size': self.size, 'bins': {k: list(v) for k, v in sorted(self.bins.items())}}
+
+    def encode(self, state):
+        state = normalize_state(state)
+        index = 0
+        for name, radix in zip(self.features, self._radices):
+            index = index * radix + _bin(self.bins[name], state.get(name))
+        return (index,)
+
+
+class TileCodingEncoder:
+    """
+    Overlapping bucketings ("tilings"), each shifted by a fraction of a bin.
+
+    Args:
+        bins (dict, optional): Feature name -> ascending bin edges. Defaults to DEFAULT_BINS.
+        tilings (int): Number of tilings, i.e. active rows per state.
+    """
+
+    name = 'tiles'
+
+    def __init__(self, bins=None, tilings=4):
+        self.bins = dict(bins or DEFAULT_BINS)
+        self.tilings = tilings
+        self.features = sorted(self.bins)
+        # One extra bin per feature for the shifted upper edge, one for missing values
+        self._radices = [len(self.bins[name]) + 3 for name in self.features]
+        self._tiling_size = math.prod(self._radices)
+        self.size = self._tiling_size * tilings
+
+    @property
+    def spec(self):
+        return {'name': self.name, 'size': self.size, 'tilings': self.tilings,
+                'bins': {k: list(v) for k, v in sorted(self.bins.items())}}
+
+    def encode(self, state):
+        state = normalize_state(state)
+        positions = [_position(self.bins[name], state.get(name)) for name in self.features]
+        rows = []
+        for tiling in range(self.tilings):
+            offset = tiling / self.tilings
+            index = 0
+            for position, radix in zip(positions, self._radices):
+                cell = radix - 1 if position is None else int(position + offset)
+                index = index * radix + cell
+            rows.append(tiling * self._tiling_size + index)
+        return tuple(rows)
+
+
+class HashingEncoder:
+    """
+    Hashes feature=bin tokens, tests/lint crosses and lint rule names into a fixed number of rows.
+
+    Args:
+        size (int): Number of rows.
+        bins (dict, optional): Feature name -> ascending bin edges. Defaults to DEFAULT_BINS.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, size=4096, bins=None):
+        self.size = size
+        self.bins = dict(bins or DEFAULT_BINS)
+
+    @property
+    def spec(self):
+        return {'name': self.name, 'size': self.size, 'bins': {k: list(v) for k, v in sorted(self.bins.items())}}
+
+    def tokens(self, state):
+        state = normalize_state(state)
+        binned = {name: _bin(edges, state.get(name)) for name, edges in sorted(self.bins.items())}
+        tokens = ['bias'] + [f"{name}={value}" for name, value in binned.items()]
+        tokens.append(f"tests_passed={binned.get('tests_passed')}&lint_errors={binned.get('lint_errors')}")
+        for rule, count in sorted((state.get('lint_rules') or {}).items()):
+            tokens.append(f"rule={rule}:{_bin((1, 2, 4, 8), count)}")
+        return tokens
+
+    def encode(self, state):
+        rows = (zlib.crc32(token.encode('utf-8')) % self.size for token in self.tokens(state))
+        return tuple(dict.fromkeys(rows))
+
+
+ENCODERS = {
+    BucketEncoder.name: BucketEncoder,
+    TileCodingEncoder.name: TileCodingEncoder,
+    HashingEncoder.name: HashingEncoder,
+}
+
+
+def get_encoder(name=None, **options):
+    """Creates an encoder by name, defaulting to AI_ASSISTANT_STATE_ENCODER or 'bucket'."""
+    name = name or os.getenv('AI_ASSISTANT_STATE_ENCODER', BucketEncoder.name)
+    try:
+        return ENCODERS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown state encoder '{name}', expected one of: {', '.join(ENCODERS)}") from None
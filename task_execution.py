@@ -2,6 +2,9 @@ import subprocess
 import shutil
 from rich.console import Console
 
+# Reward weights live in reward_calculation; kept importable from here for existing callers
+from reward_calculation import calculate_reward
+
 console = Console()
 
 def run_tests(project_dir):
@@ -9,7 +12,7 @@ def run_tests(project_dir):
     npm_path = shutil.which('npm')
     if npm_path is None:
         console.print("[red]Error: 'npm' command not found. Please install Node.js.[/red]")
-        return False, ""
+        return None, ""
     try:
         result = subprocess.run([npm_path, 'test'], cwd=project_dir, capture_output=True, text=True, check=True)
         console.print("[green]Tests passed successfully.[/green]")
@@ -19,16 +22,16 @@ def run_tests(project_dir):
         return False, e.stdout + e.stderr
     except Exception as e:
         console.print(f"[red]An error occurred while running tests: {e}[/red]")
-        return False, ""
+        return None, ""
 
-def run_linter(project_dir):
+def run_linter(project_dir, paths=None):
     console.print("[bold cyan]Running linter...[/bold cyan]")
     npx_path = shutil.which('npx')
     if npx_path is None:
         console.print("[red]Error: 'npx' command not found. Please install Node.js.[/red]")
         return -1, ""
     try:
-        result = subprocess.run([npx_path, 'eslint', '.'], cwd=project_dir, capture_output=True, text=True)
+        result = subprocess.run([npx_path, 'eslint', *(paths or ['.'])], cwd=project_dir, capture_output=True, text=True)
         lint_errors = parse_lint_errors(result.stdout)
         if lint_errors == 0:
             console.print("[green]No linting errors found.[/green]")
@@ -62,9 +65,3 @@ def parse_lint_errors(lint_output):
     return error_count
 
 
-def calculate_reward(tests_passed, lint_errors, comparison_result):
-    reward = 0
-    reward += 5 if comparison_result else -5
-    reward += 10 if tests_passed else -10
-    reward -= max(lint_errors, 0)
-    return reward
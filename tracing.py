@@ -0,0 +1,197 @@
+# tracing.py
+"""
+Lightweight span/timer API for finding where time goes in a session.
+
+Spans are kept in memory while a task runs and persisted to the Timings
+table by `flush_spans`, keyed by the request they belong to.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+_local = threading.local()
+_lock = threading.Lock()
+_finished_spans = []
+
+
+class Span:
+    """
+    A timed section of work. Use it as a context manager; attributes such as
+    token counts can be attached with `set` while the span is open.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.request_id = getattr(_local, 'request_id', None)
+        self.thread_id = threading.get_ident()
+        self.start_time = None
+        self.duration_ms = None
+        self._start_counter = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = _span_stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start_time = time.time()
+        self._start_counter = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start_counter) * 1000
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        stack = _span_stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        with _lock:
+            _finished_spans.append(self)
+        return False
+
+
+def _span_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def span(name, **attributes):
+    """
+    Creates a span to be used as `with span('lint'):`.
+
+    Args:
+        name (str): The stage name, e.g. 'llm.generate_complete_code'.
+        **attributes: Extra values stored with the span.
+
+    Returns:
+        Span: The span context manager.
+    """
+    return Span(name, **attributes)
+
+
+def traced(name=None):
+    """
+    Decorator that wraps every call of the function in a span.
+
+    Args:
+        name (str, optional): The span name. Defaults to the function name.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(current_span, response):
+    """Copies the token counts of an OpenAI response onto a span."""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    current_span.set(prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                     completion_tokens=getattr(usage, 'completion_tokens', None),
+                     total_tokens=getattr(usage, 'total_tokens', None))
+
+
+def set_request_id(request_id):
+    """Associates spans started from now on (in this thread) with a request."""
+    _local.request_id = request_id
+
+
+def get_request_id():
+    """Returns the request this thread's spans are currently associated with."""
+    return getattr(_local, 'request_id', None)
+
+
+def get_finished_spans():
+    with _lock:
+        return list(_finished_spans)
+
+
+def discard_spans():
+    """Drops finished spans without persisting them."""
+    with _lock:
+        _finished_spans.clear()
+
+
+def flush_spans(request_id=None):
+    """
+    Persists finished spans to the Timings table and clears them.
+
+    Args:
+        request_id (int, optional): Only flush spans of this request, plus this
+            thread's spans that were finished before the request row existed
+            (they are assigned to it). None flushes everything.
+
+    Returns:
+        int: The number of spans written.
+    """
+    from database import insert_timings
+
+    # Unassigned spans are only claimed by the thread that produced them, so
+    # concurrent tasks (e.g. in the daemon) don't take each other's spans
+    thread_id = threading.get_ident()
+    with _lock:
+        spans, remaining = [], []
+        for finished in _finished_spans:
+            if request_id is None or finished.request_id == request_id or \
+                    (finished.request_id is None and finished.thread_id == thread_id):
+                spans.append(finished)
+            else:
+                remaining.append(finished)
+        _finished_spans[:] = remaining
+    if not spans:
+        return 0
+
+    rows = []
+    for finished in spans:
+        rows.append((finished.request_id if finished.request_id is not None else request_id,
+                     finished.name, finished.parent, finished.start_time, finished.duration_ms,
+                     finished.thread_id, json.dumps(finished.attributes)))
+    insert_timings(rows)
+    return len(rows)
+
+
+def export_chrome_trace(output_file, request_id=None):
+    """
+    Exports persisted spans as Chrome trace JSON (chrome://tracing, Perfetto).
+
+    Args:
+        output_file (str): Path of the JSON file to write.
+        request_id (int, optional): Only export spans of this request.
+
+    Returns:
+        int: The number of exported events.
+    """
+    from database import get_timings
+
+    events = []
+    for row in get_timings(request_id):
+        req_id, name, parent, start_time, duration_ms, thread_id, attributes = row
+        args = json.loads(attributes) if attributes else {}
+        if parent:
+            args['parent'] = parent
+        events.append({
+            'name': name,
+            'cat': name.split('.')[0],
+            'ph': 'X',
+            'ts': start_time * 1_000_000,
+            'dur': duration_ms * 1000,
+            'pid': req_id if req_id is not None else os.getpid(),
+            'tid': thread_id,
+            'args': args,
+        })
+
+    with open(output_file, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)